@@ -1,25 +1,18 @@
 import streamlit as st
-import pdfplumber
-import spacy
 import re
 from datetime import datetime
-from collections import Counter
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import csv
 import os
 
-from email_utils import send_email
+from email_outbox import enqueue_email, resume_outbox
 from job_database import create_job_table, add_job, get_all_jobs
-from fpdf import FPDF  # PDF generation
-
-# Ensure spaCy model is installed and downloaded
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    from spacy.cli import download as spacy_download
-    spacy_download("en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
+from pdf_utils import extract_text_from_pdf
+from pdf_render import save_text_as_pdf
+from resume_sections import SECTION_WEIGHTS
+import keywords
+from app_cache import analysis, cache_stats, clear_cache, resume_scores
+from batch_screening import screen_resumes, results_to_csv
+from application_store import save_application, load_applications, count_applications
+from instrumentation import begin_request, end_request, profile, prometheus_text, start_metrics_server
 
 # ---- Constants ----
 INTERVIEW_QUESTIONS = {
@@ -38,102 +31,49 @@ INTERVIEW_QUESTIONS = {
     ],
 }
 
-APPLICATIONS_FILE = "applications.csv"
+APPLICATIONS_PAGE_SIZE = 25
+PROFILE_MODES = {"Off": None, "cProfile": "cprofile", "pyinstrument": "pyinstrument"}
+# Width of the timing bars in the sidebar waterfall
+WATERFALL_WIDTH = 24
 PORTFOLIO_FILE = "portfolio.csv"
 
 # ---- Page Config ----
 st.set_page_config(page_title="Resume & Job Match Analyzer", layout="wide")
 
-# ---- Sidebar Navigation ----
-st.sidebar.title("🔍 Navigation")
-selected_page = st.sidebar.radio("Go to", ["🏠 Home", "📝 Apply Now", "📋 Application Status"])
+# Every script run is one request; its spans make up the timing waterfall.
+# /metrics is only served when METRICS_PORT is set.
+start_metrics_server()
+begin_request("app")
 
-with st.sidebar.expander("📊 Stats"):
-    app_count = len(open(APPLICATIONS_FILE).readlines()) - 1 if os.path.exists(APPLICATIONS_FILE) else 0
-    st.markdown(f"**Total Applications:** {app_count}")
+@st.cache_resource
+def start_outbox():
+    # Once per server process: pick up mail queued before a restart
+    return resume_outbox()
 
-# ---- Utility Functions ----
+start_outbox()
 
-def extract_text_from_pdf(pdf_file):
-    with pdfplumber.open(pdf_file) as pdf:
-        return " ".join([page.extract_text() for page in pdf.pages if page.extract_text()])
-
-def calculate_similarity(text1, text2):
-    tfidf = TfidfVectorizer().fit_transform([text1, text2])
-    score = cosine_similarity(tfidf[0:1], tfidf[1:2])
-    return round(float(score[0][0]) * 100, 2)
-
-def split_resume_sections(resume_text):
-    sections = {}
-    current_section = "Summary"
-    sections[current_section] = []
-
-    section_headers = ["summary", "objective", "experience", "work history", "skills", "education", "certifications", "projects"]
-
-    lines = resume_text.split("\n")
-    for line in lines:
-        line_lower = line.strip().lower()
-        if any(header in line_lower for header in section_headers):
-            for header in section_headers:
-                if header in line_lower:
-                    current_section = header.title()
-                    sections[current_section] = []
-                    break
-        else:
-            sections[current_section].append(line.strip())
+# ---- Sidebar Navigation ----
+st.sidebar.title("🔍 Navigation")
+selected_page = st.sidebar.radio("Go to", ["🏠 Home", "📦 Batch Screening", "📝 Apply Now", "📋 Application Status"])
 
-    for key in sections:
-        sections[key] = " ".join(sections[key]).strip()
+with st.sidebar.expander("📊 Stats"):
+    st.markdown(f"**Total Applications:** {count_applications()}")
+    for name, counts in sorted(cache_stats().items()):
+        st.caption(f"Cache {name}: {counts['hits']} hits / {counts['misses']} misses")
+    if st.button("🧹 Clear caches"):
+        clear_cache()
 
-    return sections
+with st.sidebar.expander("⏱️ Performance"):
+    show_timings = st.checkbox("Show request timings")
+    profile_mode = PROFILE_MODES[st.selectbox("Profile this run", list(PROFILE_MODES))]
 
-def calculate_section_scores(sections, job_desc_text):
-    scores = {}
-    for section, text in sections.items():
-        scores[section] = calculate_similarity(text, job_desc_text) if text else 0.0
-    return scores
+# ---- Utility Functions ----
 
 def get_suggestions(resume_text, job_desc_text):
-    resume_doc = nlp(resume_text.lower())
-    job_doc = nlp(job_desc_text.lower())
-
-    def clean_tokens(doc):
-        return [token.lemma_ for token in doc if token.is_alpha and not token.is_stop]
-
-    resume_tokens = set(clean_tokens(resume_doc))
-    job_tokens = clean_tokens(job_doc)
-    job_token_freq = Counter(job_tokens)
-
-    missing_keywords = [(kw, freq) for kw, freq in job_token_freq.items() if kw not in resume_tokens]
-    missing_keywords.sort(key=lambda x: x[1], reverse=True)
-
-    suggestions = "### 🔍 Ranked Missing Keywords (Most Important First):\n\n"
-    if missing_keywords:
-        for kw, freq in missing_keywords[:20]:
-            suggestions += f"- **{kw}** (mentioned {freq} times)\n"
-        suggestions += "\n📌 Try incorporating the above keywords to better align your resume."
-    else:
-        suggestions += "Your resume already includes most of the important keywords from the job description!"
-
-    return suggestions
+    return keywords.get_suggestions(resume_text, job_desc_text, analyze=analysis)
 
 def keyword_matching(resume_text, job_desc_text):
-    resume_doc = nlp(resume_text.lower())
-    job_doc = nlp(job_desc_text.lower())
-
-    resume_tokens = set(token.lemma_ for token in resume_doc if token.is_alpha and not token.is_stop)
-    job_tokens = set(token.lemma_ for token in job_doc if token.is_alpha and not token.is_stop)
-
-    matched = job_tokens.intersection(resume_tokens)
-    missing = job_tokens - resume_tokens
-
-    def highlight_keywords(words, color):
-        return ", ".join([f"<span style='color:{color}'>{w}</span>" for w in sorted(words)])
-
-    matched_str = highlight_keywords(matched, "green")
-    missing_str = highlight_keywords(missing, "red")
-
-    return matched_str, missing_str
+    return keywords.keyword_matching(resume_text, job_desc_text, analyze=analysis)
 
 def extract_basic_info(text):
     email = re.findall(r'[\w\.-]+@[\w\.-]+', text)
@@ -145,31 +85,6 @@ def extract_basic_info(text):
         "phone": phone[0] if phone else ""
     }
 
-def save_application(data):
-    file_exists = os.path.isfile(APPLICATIONS_FILE)
-    with open(APPLICATIONS_FILE, mode='a', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=data.keys())
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(data)
-
-def load_applications():
-    if not os.path.isfile(APPLICATIONS_FILE):
-        return []
-    with open(APPLICATIONS_FILE, mode='r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        return list(reader)
-
-def save_text_as_pdf(text, filename):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_font('DejaVu', '', '/mnt/data/00ae9d37-0ff1-4cb4-b7f8-2d3bf033f85b.ttf', uni=True)
-    pdf.set_font("DejaVu", size=12)
-    for line in text.split('\n'):
-        pdf.multi_cell(0, 10, line)
-    pdf.output(filename)
-
 # ---- Pages ----
 
 def application_form(prefill_data=None, job_info=None):
@@ -227,25 +142,46 @@ Best regards,
 {job_company}
 """
 
-                try:
-                    send_email(
-                        to=email,
-                        subject="Your Application Has Been Received",
-                        body=email_body
-                    )
-                except Exception as e:
-                    st.error(f"❌ Failed to send email: {e}")
+                # Sent in the background by the outbox worker
+                enqueue_email(
+                    to=email,
+                    subject="Your Application Has Been Received",
+                    body=email_body
+                )
 
     if st.session_state["submitted"]:
         message_container.success("✅ Application submitted! Please also visit the official job page to complete your application.")
 
 def application_status_page():
     st.title("📋 Submitted Applications Status")
-    applications = load_applications()
-    if not applications:
+    total = count_applications()
+    if not total:
         st.info("No applications submitted yet.")
     else:
+        page_count = (total + APPLICATIONS_PAGE_SIZE - 1) // APPLICATIONS_PAGE_SIZE
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+        applications = load_applications(limit=APPLICATIONS_PAGE_SIZE, offset=(page - 1) * APPLICATIONS_PAGE_SIZE)
         st.dataframe(applications)
+        st.caption(f"Page {page} of {page_count} · {total} applications")
+
+def batch_screening_page():
+    st.title("📦 Batch Resume Screening")
+    resume_files = st.file_uploader("Upload Resumes (PDF)", type="pdf", accept_multiple_files=True)
+    job_desc = st.text_area("Paste Job Description Here")
+
+    if resume_files and job_desc and st.button("🚀 Screen Resumes"):
+        with st.spinner(f"Screening {len(resume_files)} resumes..."):
+            results, stats = screen_resumes(resume_files, job_desc)
+
+        st.success(f"Screened {stats['resumes']} resumes in {stats['seconds']}s "
+                   f"({stats['resumes_per_second']} resumes/s)")
+        st.dataframe(results)
+        st.download_button(
+            label="⬇️ Download Results CSV",
+            data=results_to_csv(results),
+            file_name="screening_results.csv",
+            mime="text/csv"
+        )
 
 def main_page():
     st.title("📄 Resume & Job Match Analyzer")
@@ -256,16 +192,16 @@ def main_page():
         with st.spinner("Extracting text from resume..."):
             resume_text = extract_text_from_pdf(resume_file)
 
-        sections = split_resume_sections(resume_text)
-        section_scores = calculate_section_scores(sections, job_desc)
+        section_scores, score, weighted_score = resume_scores(resume_text, job_desc, SECTION_WEIGHTS)
 
         st.subheader("📊 Section-wise Match Scores")
-        for section, score in section_scores.items():
-            st.write(f"**{section}:** {score}%")
+        for section, section_score in section_scores.items():
+            st.write(f"**{section}:** {section_score}%")
 
         st.subheader("✅ Overall Match Score")
-        score = calculate_similarity(resume_text, job_desc)
         st.metric(label="Match Score", value=f"{score}%")
+        if weighted_score is not None:
+            st.metric(label="Weighted Section Score", value=f"{weighted_score}%")
 
         if score < 70:
             st.warning("The match is below 70%. Consider improving your resume.")
@@ -286,16 +222,15 @@ def main_page():
             os.makedirs(save_folder, exist_ok=True)
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = os.path.join(save_folder, f"resume_{timestamp}.pdf")
-            save_text_as_pdf(resume_text, filename)
+            pdf_bytes = save_text_as_pdf(resume_text, filename)
             st.success(f"Resume saved as PDF: {filename}")
 
-            with open(filename, "rb") as f:
-                st.download_button(
-                    label="⬇️ Download Resume PDF",
-                    data=f,
-                    file_name=os.path.basename(filename),
-                    mime="application/pdf"
-                )
+            st.download_button(
+                label="⬇️ Download Resume PDF",
+                data=pdf_bytes,
+                file_name=os.path.basename(filename),
+                mime="application/pdf"
+            )
 
         if st.button("Apply for this Job"):
             basic_info = extract_basic_info(resume_text)
@@ -307,13 +242,51 @@ def main_page():
             st.session_state["application_info"] = (basic_info, job_info)
             st.experimental_rerun()
 
-if selected_page == "🏠 Home":
-    main_page()
-elif selected_page == "📝 Apply Now":
-    if "application_info" in st.session_state:
-        prefill, job_info = st.session_state["application_info"]
-        application_form(prefill, job_info)
+def timing_panel(waterfall):
+    with st.sidebar.expander("⏱️ Request timings", expanded=True):
+        total = max(waterfall["total_ms"], 1.0)
+        st.caption(f"Total: {waterfall['total_ms']:.0f} ms")
+        rows = []
+        for record in waterfall["spans"]:
+            offset = int(record["start_ms"] / total * WATERFALL_WIDTH)
+            width = max(1, round(record["duration_ms"] / total * WATERFALL_WIDTH))
+            rows.append({
+                "span": "  " * record["depth"] + record["name"],
+                "start (ms)": round(record["start_ms"], 1),
+                "took (ms)": round(record["duration_ms"], 1),
+                "waterfall": "·" * offset + "█" * width,
+            })
+        if rows:
+            st.dataframe(rows, hide_index=True)
+        else:
+            st.info("Nothing instrumented ran (or it was served from cache).")
+        st.download_button("⬇️ Prometheus metrics", prometheus_text(), file_name="metrics.txt", mime="text/plain")
+
+def render_page():
+    if selected_page == "🏠 Home":
+        main_page()
+    elif selected_page == "📦 Batch Screening":
+        batch_screening_page()
+    elif selected_page == "📝 Apply Now":
+        if "application_info" in st.session_state:
+            prefill, job_info = st.session_state["application_info"]
+            application_form(prefill, job_info)
+        else:
+            st.info("Please analyze your resume and job description first on the Home page, then click 'Apply for this Job'.")
+    elif selected_page == "📋 Application Status":
+        application_status_page()
+
+try:
+    if profile_mode:
+        with profile(profile_mode) as profile_result:
+            render_page()
     else:
-        st.info("Please analyze your resume and job description first on the Home page, then click 'Apply for this Job'.")
-elif selected_page == "📋 Application Status":
-    application_status_page()
\ No newline at end of file
+        render_page()
+finally:
+    # st.experimental_rerun() raises out of the page; the request still ends
+    waterfall = end_request()
+if show_timings and waterfall:
+    timing_panel(waterfall)
+if profile_mode:
+    with st.sidebar.expander(f"🔬 Profile ({profile_result['mode']})", expanded=True):
+        st.code(profile_result["report"])
\ No newline at end of file
@@ -0,0 +1,122 @@
+import functools
+import threading
+
+import streamlit as st
+
+from feed_cache import FEED_TTLS, feed_postings, get_cached_jobs, iter_cached_jobs
+from job_database import search_jobs
+from job_dedup import dedupe_jobs
+from matching import rank_jobs, score_resume, split_resume_sections
+from nlp_utils import get_nlp, lemmas_from_doc
+
+# Process-wide caches shared by every page and session. Resources (models)
+# live as long as the process; data results expire after a TTL.
+ANALYSIS_TTL = 60 * 60
+# Served jobs are re-read from jobs.db at the shortest feed TTL
+FEED_TTL = min(FEED_TTLS.values())
+
+_stats = {}
+_stats_lock = threading.Lock()
+_clears = {}
+
+
+def _count(name, field):
+    with _stats_lock:
+        _stats.setdefault(name, {"calls": 0, "misses": 0})[field] += 1
+
+
+def _cached(name, cache, func):
+    # Every call counts; only calls that reach func are misses
+    @functools.wraps(func)
+    def load(*args, **kwargs):
+        _count(name, "misses")
+        return func(*args, **kwargs)
+
+    cached = cache(load)
+
+    @functools.wraps(func)
+    def call(*args, **kwargs):
+        _count(name, "calls")
+        return cached(*args, **kwargs)
+
+    _clears[name] = cached.clear
+    call.clear = cached.clear
+    return call
+
+
+def cached_resource(name):
+    return lambda func: _cached(name, st.cache_resource(show_spinner=False), func)
+
+
+def cached_data(name, ttl):
+    return lambda func: _cached(name, st.cache_data(ttl=ttl, show_spinner=False), func)
+
+
+def clear_cache(*names):
+    # Invalidation hook; no names clears every cache
+    for name in names or list(_clears):
+        _clears[name]()
+
+
+def cache_stats():
+    with _stats_lock:
+        return {
+            name: {"hits": counts["calls"] - counts["misses"], "misses": counts["misses"]}
+            for name, counts in _stats.items()
+        }
+
+
+@cached_resource("nlp_model")
+def nlp_model():
+    return get_nlp()
+
+
+@cached_data("analysis", ANALYSIS_TTL)
+def analysis(text):
+    # Same lemmas as nlp_utils.analyze_text, through the cached model
+    return lemmas_from_doc(nlp_model()(text.lower()))
+
+
+@cached_data("resume_scores", ANALYSIS_TTL)
+def resume_scores(resume_text, job_desc_text, weights=None):
+    return score_resume(split_resume_sections(resume_text), job_desc_text, resume_text, weights)
+
+
+@cached_data("job_feeds", FEED_TTL)
+def cached_feed_postings(feed, updated_at):
+    # One feed's postings, re-read once the feed is refetched (updated_at moves)
+    return feed_postings(feed, updated_at)
+
+
+def iter_feed_jobs(keyword, stamps):
+    # Streams (source, jobs) as each feed is ready, per-feed results cached.
+    # stamps collects the (feed, updated_at) pairs served, the feed part of
+    # the job_ranking key.
+    def load(feed, updated_at):
+        stamps.append((feed, updated_at))
+        return cached_feed_postings(feed, updated_at)
+
+    return iter_cached_jobs(keyword, load=load)
+
+
+def refresh_jobs(keyword):
+    # Revalidates every feed now; changed feeds get new cache keys
+    get_cached_jobs(keyword, force=True)
+
+
+@cached_data("job_ranking", ANALYSIS_TTL)
+def job_ranking(resume_key, feeds_key, _resume_text, _jobs, semantic_weight=0.0):
+    # Keyed on the resume hash and the feed stamps rather than hashing the
+    # resume and every posting on each rerun. Adzuna and Remotive often list
+    # the same role more than once.
+    return rank_jobs(_resume_text, dedupe_jobs(_jobs), semantic_weight=semantic_weight)
+
+
+@cached_data("corpus_ranking", ANALYSIS_TTL)
+def corpus_ranking(resume_text, top_k, locations=None, semantic_weight=0.0):
+    # Best matches from the local jobs.db corpus (see ingest.py); no feed calls
+    results = search_jobs(resume_text, top_k, locations, semantic_weight, as_dicts=True)
+    if not results and locations:
+        results = search_jobs(resume_text, top_k, None, semantic_weight, as_dicts=True)
+    # Best-scoring copy of each near-duplicate posting
+    return dedupe_jobs(results, job=lambda item: item[0])
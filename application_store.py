@@ -0,0 +1,116 @@
+import csv
+import os
+import re
+from datetime import datetime
+
+from db_utils import open_connection
+
+APPLICATIONS_DB = "applications.db"
+LEGACY_CSV = "applications.csv"
+
+APPLICATION_COLUMNS = [
+    "timestamp", "name", "email", "phone", "education", "experience",
+    "job_title", "job_company", "job_location", "status",
+]
+DEFAULT_STATUS = "Submitted"
+
+TIMESTAMP_RE = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$")
+
+_ready = set()
+
+def get_connection():
+    conn = open_connection(APPLICATIONS_DB)
+    if APPLICATIONS_DB not in _ready:
+        _create_schema(conn)
+        _ready.add(APPLICATIONS_DB)
+        migrate_legacy_csv()
+    return conn
+
+def _create_schema(conn):
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS applications (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT,
+                    name TEXT,
+                    email TEXT,
+                    phone TEXT,
+                    education TEXT,
+                    experience TEXT,
+                    job_title TEXT,
+                    job_company TEXT,
+                    job_location TEXT,
+                    status TEXT DEFAULT 'Submitted'
+                )''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_applications_email ON applications (email)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_applications_job ON applications (job_title, job_company)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_applications_timestamp ON applications (timestamp)")
+    # Row count kept up to date by triggers, so the sidebar never scans the table
+    c.execute("CREATE TABLE IF NOT EXISTS application_stats (key TEXT PRIMARY KEY, value INTEGER)")
+    c.execute("INSERT OR IGNORE INTO application_stats (key, value) SELECT 'count', COUNT(*) FROM applications")
+    c.execute('''CREATE TRIGGER IF NOT EXISTS applications_count_insert AFTER INSERT ON applications
+                 BEGIN UPDATE application_stats SET value = value + 1 WHERE key = 'count'; END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS applications_count_delete AFTER DELETE ON applications
+                 BEGIN UPDATE application_stats SET value = value - 1 WHERE key = 'count'; END''')
+    c.execute("CREATE TABLE IF NOT EXISTS migrations (name TEXT PRIMARY KEY, applied_at TEXT)")
+    conn.commit()
+
+def _insert_rows(conn, rows):
+    placeholders = ", ".join("?" for _ in APPLICATION_COLUMNS)
+    conn.executemany(
+        f"INSERT INTO applications ({', '.join(APPLICATION_COLUMNS)}) VALUES ({placeholders})",
+        ([row.get(column) or (DEFAULT_STATUS if column == "status" else "") for column in APPLICATION_COLUMNS]
+         for row in rows))
+
+def save_application(data):
+    conn = get_connection()
+    with conn:
+        _insert_rows(conn, [data])
+    return conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+
+def count_applications():
+    row = get_connection().execute("SELECT value FROM application_stats WHERE key = 'count'").fetchone()
+    return row[0] if row else 0
+
+def load_applications(limit=None, offset=0, email=None):
+    # Newest first, one page at a time
+    c = get_connection().cursor()
+    query = f"SELECT {', '.join(APPLICATION_COLUMNS)} FROM applications"
+    params = []
+    if email:
+        query += " WHERE email = ?"
+        params.append(email)
+    query += " ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
+    params += [-1 if limit is None else limit, offset]
+    return [dict(zip(APPLICATION_COLUMNS, row)) for row in c.execute(query, params)]
+
+def _legacy_row(header, row):
+    # Rows written by file_utils carry their own column names
+    if "status" in header:
+        return {column: value.strip() for column, value in zip(header, row)}
+
+    # Rows written by app.py are positional, but the first ones were written
+    # with the timestamp last and later ones gained job columns the header
+    # never had. Put the timestamp first and map the rest by position.
+    values = [value.strip() for value in row]
+    stamp = next((i for i, value in enumerate(values) if TIMESTAMP_RE.match(value)), None)
+    timestamp = values.pop(stamp) if stamp is not None else ""
+    return dict(zip(APPLICATION_COLUMNS, [timestamp] + values))
+
+def migrate_legacy_csv(csv_path=LEGACY_CSV):
+    # One-shot import of the old CSV store; recorded so it never runs twice
+    if not os.path.isfile(csv_path):
+        return 0
+    conn = open_connection(APPLICATIONS_DB)
+    name = f"legacy_csv:{os.path.abspath(csv_path)}"
+    if conn.execute("SELECT 1 FROM migrations WHERE name = ?", (name,)).fetchone():
+        return 0
+
+    with open(csv_path, mode='r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = [column.strip().lower() for column in next(reader, [])]
+        rows = [_legacy_row(header, row) for row in reader if any(value.strip() for value in row)]
+    with conn:
+        _insert_rows(conn, rows)
+        conn.execute("INSERT INTO migrations (name, applied_at) VALUES (?, ?)",
+                     (name, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    return len(rows)
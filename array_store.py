@@ -0,0 +1,122 @@
+import json
+import os
+
+import numpy as np
+
+from file_lock import locked
+
+# On-disk layout shared by the TF-IDF index (job_index), the embedding store
+# (job_embeddings) and the ANN index (job_ann). Every array is a raw
+# <name>.bin file, appended to in place and read back with np.memmap.
+# meta.json records how much of each array is committed and is written last,
+# so it is the commit point of every update: bytes an interrupted append left
+# past the committed lengths are cut (recover_arrays) before the next write.
+# Deleted jobs are tombstoned in deleted.bin (n_deleted in meta.json) and
+# skipped at search time until the next full rebuild.
+META_FILE = "meta.json"
+DELETED = "deleted"
+
+
+def path(directory, name):
+    return os.path.join(directory, name)
+
+
+def array_path(directory, name):
+    return path(directory, f"{name}.bin")
+
+
+def read_meta(directory):
+    meta_path = path(directory, META_FILE)
+    if not os.path.isfile(meta_path):
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_meta(directory, meta):
+    tmp = path(directory, META_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, path(directory, META_FILE))
+
+
+def write_array(directory, name, values, dtype):
+    # Replace rather than truncate, memmaps of the old file stay readable
+    tmp = array_path(directory, name) + ".tmp"
+    np.asarray(values, dtype=dtype).tofile(tmp)
+    os.replace(tmp, array_path(directory, name))
+
+
+def append_array(directory, name, values, dtype):
+    with open(array_path(directory, name), "ab") as f:
+        np.asarray(values, dtype=dtype).tofile(f)
+
+
+def array_length(directory, name, dtype):
+    file_path = array_path(directory, name)
+    return os.path.getsize(file_path) // np.dtype(dtype).itemsize if os.path.isfile(file_path) else 0
+
+
+def memmap(directory, name, dtype, length, width=None):
+    shape = (length,) if width is None else (length, width)
+    if length == 0:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(array_path(directory, name), dtype=dtype, mode="r", shape=shape)
+
+
+def truncate(file_path, size):
+    # Drops bytes past size, left by an append whose metadata was never
+    # written. Returns True when something was cut.
+    if os.path.isfile(file_path) and os.path.getsize(file_path) > size:
+        with open(file_path, "r+b") as f:
+            f.truncate(size)
+        return True
+    return False
+
+
+def recover_arrays(directory, meta, dtypes, lengths):
+    # Cuts each array back to its committed length in items (lengths maps
+    # name -> items), the tombstones included. True when something was cut.
+    cut = False
+    for name, length in {**lengths, DELETED: meta.get("n_deleted", 0)}.items():
+        cut = truncate(array_path(directory, name), length * np.dtype(dtypes[name]).itemsize) or cut
+    return cut
+
+
+def load_cached(directory, cache, load):
+    # load(meta) for the directory, reused until meta.json changes; cache is
+    # the caller's {"key": None, "value": None}. None when nothing is stored.
+    meta_path = path(directory, META_FILE)
+    try:
+        stat = os.stat(meta_path)
+    except FileNotFoundError:
+        return None
+    key = (os.path.abspath(directory), stat.st_mtime_ns, stat.st_size)
+    if cache["key"] == key:
+        return cache["value"]
+    value = load(read_meta(directory))
+    cache.update(key=key, value=value)
+    return value
+
+
+def deleted_ids(directory, meta):
+    return np.asarray(memmap(directory, DELETED, np.int64, meta.get("n_deleted", 0)))
+
+
+def alive_mask(ids, deleted):
+    # Row mask without the tombstoned jobs, None when nothing was deleted
+    return ~np.isin(ids, deleted) if len(deleted) else None
+
+
+def delete_ids(directory, job_ids, recover):
+    # Tombstones job ids under the directory's lock. recover(directory, meta)
+    # is the store's own recovery, so the append lands at the committed end.
+    job_ids = list(job_ids)
+    if not job_ids or read_meta(directory) is None:
+        return
+    with locked(directory):
+        meta = read_meta(directory)
+        recover(directory, meta)
+        append_array(directory, DELETED, job_ids, np.int64)
+        meta["n_deleted"] = meta.get("n_deleted", 0) + len(job_ids)
+        write_meta(directory, meta)
@@ -0,0 +1,133 @@
+import argparse
+import csv
+import io
+import os
+import time
+
+import numpy as np
+
+from instrumentation import span
+from matching import split_resume_sections
+from nlp_utils import get_nlp, lemmas_from_doc
+from pdf_utils import extract_text_from_pdf, read_pdf_bytes
+from worker_pool import default_workers, get_pool
+
+DEFAULT_BATCH_SIZE = 64
+
+
+def _extract_one(pdf_bytes):
+    # Runs in a worker process; one document per worker, no nested pool
+    return extract_text_from_pdf(pdf_bytes, workers=1)
+
+
+def extract_all(pdf_files, workers=None):
+    pdf_bytes = [read_pdf_bytes(f) for f in pdf_files]
+    if workers is None:
+        workers = default_workers()
+    if workers <= 1 or len(pdf_bytes) < 2:
+        return [_extract_one(data) for data in pdf_bytes]
+    chunksize = max(1, len(pdf_bytes) // (workers * 4))
+    return list(get_pool(workers).map(_extract_one, pdf_bytes, chunksize=chunksize))
+
+
+@span("nlp.lemmatize_batch")
+def lemmatize_all(texts, n_process=1, batch_size=DEFAULT_BATCH_SIZE):
+    docs = get_nlp().pipe((text.lower() for text in texts), n_process=n_process, batch_size=batch_size)
+    return [" ".join(lemmas_from_doc(doc)) for doc in docs]
+
+
+@span("scoring.score_resumes")
+def score_resumes(resume_texts, job_desc_text, n_process=1, batch_size=DEFAULT_BATCH_SIZE):
+    # Section and overall scores for every resume from one TF-IDF fit.
+    # Only the job description and the sections are lemmatized; a resume's
+    # overall document is the concatenation of its section lemmas.
+    all_sections = [split_resume_sections(text) for text in resume_texts]
+    section_keys = [(i, name) for i, sections in enumerate(all_sections) for name in sections]
+    section_texts = [all_sections[i][name] for i, name in section_keys]
+
+    lemmas = lemmatize_all([job_desc_text] + section_texts, n_process, batch_size)
+    job_lemmas, section_lemmas = lemmas[0], lemmas[1:]
+
+    resume_lemmas = [[] for _ in resume_texts]
+    for (i, _), text in zip(section_keys, section_lemmas):
+        resume_lemmas[i].append(text)
+    resume_lemmas = [" ".join(parts) for parts in resume_lemmas]
+
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    try:
+        tfidf = TfidfVectorizer().fit_transform([job_lemmas] + resume_lemmas + section_lemmas)
+        scores = (tfidf[1:] @ tfidf[0].T).toarray().ravel()
+    except ValueError:
+        scores = np.zeros(len(resume_lemmas) + len(section_lemmas))
+    scores = np.round(scores * 100, 2)
+
+    overall = scores[:len(resume_texts)]
+    section_scores = [{} for _ in resume_texts]
+    for (i, name), score in zip(section_keys, scores[len(resume_texts):]):
+        section_scores[i][name] = float(score) if all_sections[i][name] else 0.0
+    return [float(score) for score in overall], section_scores
+
+
+def screen_resumes(pdf_files, job_desc_text, names=None, workers=None, n_process=1, batch_size=DEFAULT_BATCH_SIZE):
+    start = time.perf_counter()
+    if names is None:
+        names = [getattr(f, "name", str(f)) for f in pdf_files]
+
+    resume_texts = extract_all(pdf_files, workers)
+    overall, section_scores = score_resumes(resume_texts, job_desc_text, n_process, batch_size)
+
+    results = []
+    for name, score, sections in zip(names, overall, section_scores):
+        row = {"rank": 0, "file": os.path.basename(name), "overall_score": score}
+        row.update({f"{section} score": value for section, value in sections.items()})
+        results.append(row)
+    results.sort(key=lambda row: row["overall_score"], reverse=True)
+    for rank, row in enumerate(results, start=1):
+        row["rank"] = rank
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "resumes": len(results),
+        "seconds": round(elapsed, 3),
+        "resumes_per_second": round(len(results) / elapsed, 2) if elapsed else 0.0,
+    }
+    return results, stats
+
+
+def results_to_csv(results):
+    fieldnames = ["rank", "file", "overall_score"]
+    for row in results:
+        fieldnames += [key for key in row if key not in fieldnames]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, restval=0.0)
+    writer.writeheader()
+    writer.writerows(results)
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank many resumes against one job description.")
+    parser.add_argument("job_description", help="text file with the job description")
+    parser.add_argument("resumes", nargs="+", help="resume PDF files")
+    parser.add_argument("-o", "--output", default="screening_results.csv")
+    parser.add_argument("--workers", type=int, default=None, help="PDF extraction processes (default: up to 4)")
+    parser.add_argument("--n-process", type=int, default=1, help="spaCy nlp.pipe processes")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    with open(args.job_description, encoding="utf-8") as f:
+        job_desc = f.read()
+
+    results, stats = screen_resumes(args.resumes, job_desc, args.resumes, args.workers, args.n_process, args.batch_size)
+    with open(args.output, "w", newline="", encoding="utf-8") as f:
+        f.write(results_to_csv(results))
+
+    for row in results[:10]:
+        print(f"{row['rank']:>4}  {row['overall_score']:>6}%  {row['file']}")
+    print(f"✅ Screened {stats['resumes']} resumes in {stats['seconds']}s "
+          f"({stats['resumes_per_second']} resumes/s), results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Offline benchmark of the matching pipeline. Inputs are synthetic resumes and
+# job corpora generated from benchmark_fixtures/, synthetic Adzuna and Remotive
+# responses (not recordings) that a local stub server also replays for the
+# feed stage. Their postings share a handful of template sentences, so the
+# numbers are for comparing commits, not a forecast for real postings.
+# Results are JSON (latency percentiles, throughput, peak traced memory) so
+# runs from different commits can be compared with --compare.
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(REPO_DIR, "benchmark_fixtures")
+CORPUS_SIZES = [100, 1000, 10000, 100000]
+QUICK_CORPUS_SIZES = [100, 1000]
+RESUME_LINES = [50, 500, 5000]
+PDF_PAGES = [1, 5, 20]
+STAGES = ["pdf", "sections", "scoring", "keywords", "feeds", "ranking"]
+# A change is reported as a regression past this fraction
+REGRESSION_THRESHOLD = 0.10
+
+HEADERS = ["Summary", "Experience", "Skills", "Projects", "Education", "Certifications"]
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def fixture_jobs():
+    from job_feeds import parse_feed
+
+    return (parse_feed("Adzuna", load_fixture("adzuna_search.json"))
+            + parse_feed("Remotive", load_fixture("remotive_jobs.json")))
+
+
+def _vocabulary(jobs):
+    words = sorted({word.strip(".,;:()<>/").lower() for job in jobs for word in job["description"].split()})
+    return [word for word in words if word.isalpha()]
+
+
+def generate_jobs(n, seed=0):
+    # n postings built from the fixture postings: their sentences reshuffled,
+    # plus Zipf-distributed rare terms so the vocabulary keeps growing with n
+    rng = random.Random(seed)
+    templates = fixture_jobs()
+    sentences = [s.strip() for job in templates for s in job["description"].split(".") if s.strip()]
+    jobs = []
+    for i in range(n):
+        template = templates[i % len(templates)]
+        rare = " ".join(f"term{int(z)}" for z in np.random.default_rng(seed + i).zipf(1.3, 8) if z < 10 ** 6)
+        description = ". ".join(rng.sample(sentences, 4)) + ". " + rare
+        jobs.append(dict(template, id=i + 1, title=f"{template['title']} #{i}", description=description))
+    return jobs
+
+
+def generate_resume(lines, seed=0):
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(fixture_jobs())
+    out = ["Jane Doe", "jane.doe@example.com", "+91 98765 43210"]
+    per_section = max(1, lines // len(HEADERS))
+    for header in HEADERS:
+        out.append(header)
+        out += [" ".join(rng.choices(vocabulary, k=rng.randint(6, 14))) for _ in range(per_section)]
+    return "\n".join(out)
+
+
+def generate_pdf(pages, seed=0):
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_font("Helvetica", size=11)
+    text = generate_resume(pages * 45, seed)
+    pdf.add_page()
+    for line in text.split("\n"):
+        pdf.multi_cell(0, 6, line)
+    return pdf.output(dest="S").encode("latin-1")
+
+
+def measure(func, runs, items=1, warmup=1):
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    # Peak memory from a separate run; tracing would skew the timings
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    ms = np.array(times) * 1000
+    return {
+        "runs": runs,
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p90_ms": round(float(np.percentile(ms, 90)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "min_ms": round(float(ms.min()), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "throughput_per_s": round(items * runs / sum(times), 2),
+        "peak_mem_mb": round(peak / 2 ** 20, 3),
+    }
+
+
+def _runs_for(n, runs):
+    # Big corpora are measured fewer times so the whole suite stays tractable
+    return runs if n <= 1000 else max(1, runs // 10) if n <= 10000 else 1
+
+
+def bench_pdf(args):
+    import pdf_utils
+
+    for pages in PDF_PAGES:
+        data = generate_pdf(pages)
+
+        def cold():
+            pdf_utils.clear_pdf_cache(disk=True)
+            pdf_utils.extract_text_from_pdf(data)
+
+        yield "extract_text_from_pdf", f"{pages}_pages_cold", pages, measure(cold, args.runs, pages)
+        yield "extract_text_from_pdf", f"{pages}_pages_cached", pages, measure(
+            lambda: pdf_utils.extract_text_from_pdf(data), args.runs * 10, pages)
+
+    import pdf_render
+
+    # Export side: text -> PDF bytes with the shared font registry
+    for lines in RESUME_LINES[:2]:
+        text = generate_resume(lines)
+        yield "render_pdf", f"{lines}_lines", 1, measure(lambda: pdf_render.render_pdf(text), args.runs)
+
+
+def bench_sections(args):
+    from resume_sections import split_resume_sections
+
+    for lines in RESUME_LINES:
+        text = generate_resume(lines)
+        yield "split_resume_sections", f"{lines}_lines", lines, measure(
+            lambda: split_resume_sections(text), args.runs * 10, lines)
+
+
+def bench_scoring(args):
+    from matching import calculate_section_scores, calculate_similarity, split_resume_sections
+
+    job = generate_jobs(1)[0]["description"]
+    for lines in RESUME_LINES:
+        text = generate_resume(lines)
+        sections = split_resume_sections(text)
+        yield "calculate_section_scores", f"{lines}_lines", 1, measure(
+            lambda: calculate_section_scores(sections, job), args.runs)
+        yield "calculate_similarity", f"{lines}_lines", 1, measure(
+            lambda: calculate_similarity(text, job), args.runs)
+
+
+def bench_keywords(args):
+    import keywords
+    import nlp_utils
+
+    if not nlp_utils.model_installed(nlp_utils.MODEL_NAME):
+        yield "get_suggestions", "skipped", 0, {"skipped": f"{nlp_utils.MODEL_NAME} not installed"}
+        return
+    job = generate_jobs(1)[0]["description"]
+    for lines in RESUME_LINES[:2]:
+        text = generate_resume(lines)
+        # Cold: the memoized analysis and term tables are cleared on every call
+        for name, func in (("get_suggestions", keywords.get_suggestions),
+                           ("keyword_matching", keywords.keyword_matching)):
+            def cold():
+                nlp_utils._analysis_cache.clear()
+                keywords._term_tables.clear()
+                func(text, job)
+
+            yield name, f"{lines}_lines_cold", 1, measure(cold, args.runs)
+            yield name, f"{lines}_lines_cached", 1, measure(lambda: func(text, job), args.runs * 10)
+
+
+def _start_fixture_server():
+    # Serves the fixture responses. Remotive dates are shifted to today so
+    # the recency filter keeps them, as it would for a live response.
+    from aiohttp import web
+
+    import asyncio
+
+    adzuna = load_fixture("adzuna_search.json")
+    remotive = load_fixture("remotive_jobs.json")
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+    for job in remotive["jobs"]:
+        job["publication_date"] = today
+
+    async def adzuna_handler(request):
+        return web.json_response(adzuna)
+
+    async def remotive_handler(request):
+        return web.json_response(remotive)
+
+    app = web.Application()
+    app.router.add_get("/adzuna/{country}/search/{page}", adzuna_handler)
+    app.router.add_get("/remotive", remotive_handler)
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+
+def bench_feeds(args):
+    import job_feeds
+
+    base_url = _start_fixture_server()
+    job_feeds.ADZUNA_URL = base_url + "/adzuna/{country}/search/{page}"
+    job_feeds.REMOTIVE_URL = base_url + "/remotive"
+    jobs = len(job_feeds.fetch_all_jobs("developer"))
+    yield "fetch_all_jobs", "fixture_server", jobs, measure(lambda: job_feeds.fetch_all_jobs("developer"),
+                                                             args.runs, jobs)
+
+
+def bench_ranking(args):
+    import job_index
+    from matching import rank_jobs
+
+    resume = generate_resume(200)
+    for n in args.sizes:
+        jobs = generate_jobs(n)
+        runs = _runs_for(n, args.runs)
+        # What pages/job_matcher.py does on every visit
+        yield "rank_jobs", f"{n}_jobs", n, measure(lambda: rank_jobs(resume, jobs), runs, n)
+
+        index_dir = os.path.join(args.workdir, f"index_{n}")
+        rows = [(job["id"], job["description"]) for job in jobs]
+        yield "build_index", f"{n}_jobs", n, measure(lambda: job_index.build_index(rows, index_dir), runs, n, 0)
+        job_index.load_index(index_dir)
+        yield "search_index", f"{n}_jobs", n, measure(
+            lambda: job_index.search_index(resume, 10, index_dir), args.runs, n)
+
+
+BENCHMARKS = {
+    "pdf": bench_pdf,
+    "sections": bench_sections,
+    "scoring": bench_scoring,
+    "keywords": bench_keywords,
+    "feeds": bench_feeds,
+    "ranking": bench_ranking,
+}
+
+
+def _git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_DIR,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except OSError:
+        return None
+
+
+def run(args):
+    results = []
+    for stage in args.stages:
+        for name, case, items, stats in BENCHMARKS[stage](args):
+            row = dict({"stage": stage, "benchmark": name, "case": case, "items": items}, **stats)
+            results.append(row)
+            print(f"  {stage:<9} {name:<25} {case:<22} "
+                  + (f"p50 {row['p50_ms']:>10.3f} ms" if "p50_ms" in row else row.get("skipped", "")),
+                  file=sys.stderr)
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "stages": args.stages,
+            "sizes": args.sizes,
+            "runs": args.runs,
+            "corpus": "synthetic",
+        },
+        "results": results,
+    }
+    if args.imports:
+        import import_budget
+
+        report["imports"] = import_budget.check_budgets()
+    return report
+
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    # Rows present in both reports, with the relative change in p50 latency
+    # and throughput; regressed is True past the threshold
+    old = {(row["stage"], row["benchmark"], row["case"]): row for row in baseline["results"] if "p50_ms" in row}
+    rows = []
+    for row in current["results"]:
+        key = (row["stage"], row["benchmark"], row["case"])
+        if key not in old or "p50_ms" not in row:
+            continue
+        p50_change = row["p50_ms"] / old[key]["p50_ms"] - 1 if old[key]["p50_ms"] else 0.0
+        throughput_change = (row["throughput_per_s"] / old[key]["throughput_per_s"] - 1
+                             if old[key]["throughput_per_s"] else 0.0)
+        rows.append({
+            "stage": key[0], "benchmark": key[1], "case": key[2],
+            "p50_change": round(p50_change, 4),
+            "throughput_change": round(throughput_change, 4),
+            "regressed": p50_change > threshold,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the resume matching pipeline offline.")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--sizes", type=int, nargs="+", default=CORPUS_SIZES, help="job corpus sizes")
+    parser.add_argument("--quick", action="store_true", help=f"corpus sizes {QUICK_CORPUS_SIZES} and 5 runs")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--imports", action="store_true", help="include the import-time budget report")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare with an earlier JSON report")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+    if args.quick:
+        args.sizes, args.runs = QUICK_CORPUS_SIZES, 5
+
+    # Paths given on the command line are relative to where it was run
+    args.compare = args.compare and os.path.abspath(args.compare)
+    args.output = args.output and os.path.abspath(args.output)
+    sys.path.insert(0, REPO_DIR)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # Databases, indexes and caches the stages create stay out of the checkout
+        os.chdir(workdir)
+        args.workdir = workdir
+        try:
+            report = run(args)
+        finally:
+            os.chdir(cwd)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            report["comparison"] = compare(json.load(f), report, args.threshold)
+        for row in report["comparison"]:
+            flag = "❌" if row["regressed"] else "  "
+            print(f"{flag} {row['benchmark']:<25} {row['case']:<22} p50 {row['p50_change']:+.1%}  "
+                  f"throughput {row['throughput_change']:+.1%}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+    if args.compare and any(row["regressed"] for row in report["comparison"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
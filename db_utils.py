@@ -0,0 +1,24 @@
+import sqlite3
+import threading
+
+_local = threading.local()
+
+def open_connection(path):
+    # One connection per thread and database file, reused across calls. WAL
+    # lets readers keep going while a writer commits.
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        connections[path] = conn
+    return conn
+
+def close_connections():
+    for conn in getattr(_local, "connections", {}).values():
+        conn.close()
+    _local.connections = {}
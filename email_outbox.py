@@ -0,0 +1,181 @@
+import smtplib
+import threading
+import time
+
+import email_utils
+from application_store import APPLICATIONS_DB
+from db_utils import open_connection
+from instrumentation import span
+
+# Messages are written to an outbox table and sent by one background worker
+# over a long-lived SMTP connection, so form submissions never wait on SMTP.
+OUTBOX_DB = APPLICATIONS_DB
+BATCH_SIZE = 20
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 30
+POLL_SECONDS = 5
+# Close the SMTP connection after this long without mail to send
+IDLE_SECONDS = 60
+
+_wakeup = threading.Event()
+_stop = threading.Event()
+_worker = {"thread": None}
+_worker_lock = threading.Lock()
+_ready = set()
+
+def get_connection():
+    conn = open_connection(OUTBOX_DB)
+    if OUTBOX_DB not in _ready:
+        conn.execute('''CREATE TABLE IF NOT EXISTS outbox (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            recipient TEXT,
+                            subject TEXT,
+                            body TEXT,
+                            status TEXT DEFAULT 'pending',
+                            attempts INTEGER DEFAULT 0,
+                            next_attempt_at REAL,
+                            last_error TEXT,
+                            created_at REAL,
+                            sent_at REAL
+                        )''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at)")
+        conn.commit()
+        _ready.add(OUTBOX_DB)
+    return conn
+
+def enqueue_email(to, subject, body):
+    conn = get_connection()
+    now = time.time()
+    with conn:
+        c = conn.execute(
+            "INSERT INTO outbox (recipient, subject, body, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?)",
+            (to, subject, body, now, now))
+    start_worker()
+    _wakeup.set()
+    return c.lastrowid
+
+def resume_outbox():
+    # Called at startup: pending messages (never sent, or waiting for a retry)
+    # left by an earlier process are sent without waiting for a new enqueue
+    pending = get_connection().execute("SELECT 1 FROM outbox WHERE status = 'pending' LIMIT 1").fetchone()
+    if pending:
+        start_worker()
+    return bool(pending)
+
+def outbox_status(message_id):
+    row = get_connection().execute(
+        "SELECT status, attempts, last_error FROM outbox WHERE id = ?", (message_id,)).fetchone()
+    return dict(zip(["status", "attempts", "last_error"], row)) if row else None
+
+def outbox_counts():
+    rows = get_connection().execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+    return dict(rows)
+
+def _due_messages(conn, limit):
+    return conn.execute(
+        "SELECT id, recipient, subject, body, attempts FROM outbox "
+        "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+        (time.time(), limit)).fetchall()
+
+def _mark_sent(conn, message_id):
+    with conn:
+        conn.execute("UPDATE outbox SET status = 'sent', sent_at = ?, last_error = NULL WHERE id = ?",
+                     (time.time(), message_id))
+
+def _mark_failed(conn, message_id, attempts, error):
+    # Exponential backoff; after MAX_ATTEMPTS the message is dead-lettered
+    attempts += 1
+    status = "dead" if attempts >= MAX_ATTEMPTS else "pending"
+    next_attempt_at = time.time() + BACKOFF_SECONDS * 2 ** (attempts - 1)
+    with conn:
+        conn.execute("UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                     (status, attempts, next_attempt_at, str(error), message_id))
+
+class _SmtpSession:
+    # Keeps one authenticated connection open across batches and reconnects
+    # (re-authenticating) when the server has dropped it
+    def __init__(self):
+        self.smtp = None
+        self.last_used = 0.0
+
+    def _alive(self):
+        try:
+            return self.smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def connection(self):
+        if self.smtp is not None and not self._alive():
+            self.close()
+        if self.smtp is None:
+            self.smtp = email_utils.connect_smtp()
+        return self.smtp
+
+    @span("email.send")
+    def send(self, msg):
+        try:
+            self.connection().send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # Dropped between the liveness check and the send: one fresh retry
+            self.close()
+            self.connection().send_message(msg)
+        self.last_used = time.time()
+
+    def close(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.smtp = None
+
+@span("email.outbox_batch")
+def drain_outbox(session, limit=BATCH_SIZE):
+    # Sends one batch of due messages; returns how many were attempted
+    conn = get_connection()
+    messages = _due_messages(conn, limit)
+    for message_id, recipient, subject, body, attempts in messages:
+        try:
+            session.send(email_utils.build_message(recipient, subject, body))
+        except (smtplib.SMTPException, OSError) as e:
+            session.close()
+            _mark_failed(conn, message_id, attempts, e)
+        else:
+            _mark_sent(conn, message_id)
+    return len(messages)
+
+def _run_worker():
+    session = _SmtpSession()
+    while not _stop.is_set():
+        # Cleared before draining, so a message queued mid-batch still wakes us
+        _wakeup.clear()
+        try:
+            sent = drain_outbox(session)
+        except Exception as e:
+            print(f"❌ Email outbox worker error: {e}")
+            sent = 0
+        if sent == BATCH_SIZE:
+            continue
+        if session.smtp is not None and time.time() - session.last_used > IDLE_SECONDS:
+            session.close()
+        _wakeup.wait(POLL_SECONDS)
+    session.close()
+
+def start_worker():
+    with _worker_lock:
+        if _worker["thread"] is None or not _worker["thread"].is_alive():
+            _stop.clear()
+            thread = threading.Thread(target=_run_worker, name="email-outbox", daemon=True)
+            thread.start()
+            _worker["thread"] = thread
+
+def stop_worker():
+    # Lets the worker finish its batch, then closes the SMTP connection.
+    # Unsent messages stay queued for the next start_worker().
+    with _worker_lock:
+        thread = _worker["thread"]
+        if thread is not None:
+            _stop.set()
+            _wakeup.set()
+            thread.join()
+            _worker["thread"] = None
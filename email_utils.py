@@ -3,23 +3,39 @@ from email.message import EmailMessage
 import os
 from dotenv import load_dotenv
 
+from instrumentation import span
+
 # Load environment variables from .env
 load_dotenv()
 
 # ✅ Define these AFTER loading dotenv
 EMAIL_USER = os.getenv("EMAIL_USER")
 EMAIL_PASS = os.getenv("EMAIL_PASS")
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_SSL = os.getenv("SMTP_SSL", "1") != "0"
 
-def send_email(to, subject, body):
+def build_message(to, subject, body):
     msg = EmailMessage()
     msg["From"] = EMAIL_USER
     msg["To"] = to
     msg["Subject"] = subject
     msg.set_content(body)
+    return msg
+
+def connect_smtp(timeout=30):
+    smtp_class = smtplib.SMTP_SSL if SMTP_SSL else smtplib.SMTP
+    smtp = smtp_class(SMTP_HOST, SMTP_PORT, timeout=timeout)
+    if EMAIL_USER:
+        smtp.login(EMAIL_USER, EMAIL_PASS)
+    return smtp
+
+@span("email.send")
+def send_email(to, subject, body):
+    msg = build_message(to, subject, body)
 
     try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
-            smtp.login(EMAIL_USER, EMAIL_PASS)
+        with connect_smtp() as smtp:
             smtp.send_message(msg)
         return True
     except Exception as e:
@@ -0,0 +1,92 @@
+import time
+
+from instrumentation import span
+from job_database import create_job_table, get_feed_jobs, get_feed_state, save_feed_jobs, set_feed_state
+from job_feeds import ADZUNA_PAGES, REMOTIVE_MAX_AGE_DAYS, iter_feeds, parse_posted_at
+
+# Seconds a stored feed is served without asking the API again. After that it
+# is revalidated with ETag / If-Modified-Since and only re-downloaded if changed.
+FEED_TTLS = {"Adzuna": 30 * 60, "Remotive": 60 * 60}
+# A feed whose fetch failed is tried again after this many seconds (its TTL if
+# shorter), not on every visit
+FAILED_RETRY_SECONDS = 5 * 60
+
+
+def feed_specs(keyword, adzuna_pages=ADZUNA_PAGES):
+    specs = [
+        {"feed": f"Adzuna:{keyword}:{page}", "source": "Adzuna", "keyword": keyword, "page": page}
+        for page in range(1, adzuna_pages + 1)
+    ]
+    specs.append({"feed": "Remotive", "source": "Remotive"})
+    return specs
+
+
+def stale_feeds(specs, force=False):
+    now = int(time.time())
+    state = get_feed_state([spec["feed"] for spec in specs])
+    stale = []
+    for spec in specs:
+        known = state.get(spec["feed"])
+        if force or known is None or now - known["fetched_at"] >= FEED_TTLS[spec["source"]]:
+            validators = {
+                "etag": known["etag"] if known else None,
+                "last_modified": known["last_modified"] if known else None,
+            }
+            stale.append(dict(spec, **validators))
+    return stale
+
+
+def revalidate_feeds(stale):
+    # Conditional fetch of every stale feed; yields each result once stored
+    for result in iter_feeds(stale):
+        fetched_at = int(time.time())
+        if result["status"] == 200:
+            for job in result["jobs"]:
+                # Parsed once here, then stored as an indexed epoch
+                job["posted_at"] = parse_posted_at(job["created"])
+            save_feed_jobs(result["feed"], result["jobs"], fetched_at)
+            set_feed_state(result["feed"], fetched_at, result["etag"], result["last_modified"], fetched_at)
+        elif result["status"] == 304:
+            set_feed_state(result["feed"], fetched_at)
+        else:
+            # Stored postings keep being served. fetched_at is backdated so the
+            # feed goes stale again after FAILED_RETRY_SECONDS: during an
+            # outage each visit would otherwise wait out every retry timeout.
+            ttl = FEED_TTLS[result["source"]]
+            set_feed_state(result["feed"], fetched_at - ttl + min(FAILED_RETRY_SECONDS, ttl))
+        yield result
+
+
+def feed_postings(feed, updated_at=None):
+    # Postings of the feed's latest successful fetch. updated_at, the time of
+    # that fetch, is only there so callers can cache by it.
+    posted_since = {"Remotive": int(time.time()) - (REMOTIVE_MAX_AGE_DAYS + 1) * 86400}
+    return get_feed_jobs([feed], posted_since)
+
+
+def _updated_at(feed):
+    state = get_feed_state([feed]).get(feed)
+    return state["updated_at"] if state else None
+
+
+def iter_cached_jobs(keyword, adzuna_pages=ADZUNA_PAGES, force=False, load=feed_postings):
+    # Yields (source, jobs) per feed like job_feeds.iter_jobs, but served from
+    # jobs.db through load(feed, updated_at). Fresh feeds come first; stale
+    # ones follow as their revalidation finishes.
+    create_job_table()
+    specs = feed_specs(keyword, adzuna_pages)
+    stale = stale_feeds(specs, force)
+    stale_ids = {spec["feed"] for spec in stale}
+
+    fresh = [spec for spec in specs if spec["feed"] not in stale_ids]
+    state = get_feed_state([spec["feed"] for spec in fresh])
+    for spec in fresh:
+        yield spec["source"], load(spec["feed"], state[spec["feed"]]["updated_at"])
+
+    for result in revalidate_feeds(stale):
+        yield result["source"], load(result["feed"], _updated_at(result["feed"]))
+
+
+@span("feeds.cached_jobs")
+def get_cached_jobs(keyword, adzuna_pages=ADZUNA_PAGES, force=False):
+    return [job for _, jobs in iter_cached_jobs(keyword, adzuna_pages, force) for job in jobs]
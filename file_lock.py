@@ -0,0 +1,35 @@
+import contextlib
+import os
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# Exclusive locks for the on-disk indexes (jobs_index, jobs_vectors, jobs_ann).
+# Writers hold the directory's lock for a whole update, so page threads and
+# separate processes (ingest.py, the CLIs) never interleave appends.
+LOCK_FILE = ".lock"
+
+
+@contextlib.contextmanager
+def locked(directory):
+    # Not re-entrant: take it once, at the public entry point of an update
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), "a+b") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
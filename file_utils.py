@@ -1,19 +1,9 @@
-import csv
-import os
+from application_store import load_applications, save_application
 
-APPLICATIONS_CSV = "applications.csv"
+# Kept for older callers; applications now live in the shared SQLite store
 
 def save_application_to_csv(application_data):
-    file_exists = os.path.isfile(APPLICATIONS_CSV)
-    with open(APPLICATIONS_CSV, mode='a', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=["name", "email", "phone", "education", "experience", "status"])
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(application_data)
+    save_application(application_data)
 
 def load_applications_from_csv():
-    if not os.path.isfile(APPLICATIONS_CSV):
-        return []
-    with open(APPLICATIONS_CSV, mode='r', newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        return list(reader)
+    return load_applications()
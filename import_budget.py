@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Cold-start budget: cumulative `python -X importtime` cost of each entry point
+# and of the modules the pages import. Heavy libraries must only load on first
+# use, so none of HEAVY_MODULES may appear in a cold import.
+IMPORT_BUDGETS_MS = {
+    "app": 1000,
+    "pages.job_matcher": 1000,
+    "pages.resume_editor": 1000,
+    "app_cache": 800,
+    "job_database": 300,
+    "feed_cache": 300,
+    "pdf_utils": 300,
+    "matching": 300,
+    "nlp_utils": 50,
+    "application_store": 50,
+    "email_outbox": 150,
+}
+HEAVY_MODULES = ["sklearn", "scipy", "spacy", "pdfplumber", "aiohttp", "fpdf", "nltk"]
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_importtime(stderr):
+    # {module: (self_us, cumulative_us)} from -X importtime output
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def measure_import(module):
+    # Fresh interpreter in a scratch directory, so page scripts that touch
+    # their databases on import leave the checkout alone
+    env = dict(os.environ, PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    with tempfile.TemporaryDirectory() as cwd:
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                cwd=cwd, env=env, capture_output=True, text=True)
+    times = parse_importtime(result.stderr)
+    return {
+        "module": module,
+        "ok": result.returncode == 0,
+        "ms": round(times.get(module, (0, 0))[1] / 1000, 1),
+        "heavy": sorted({name.split(".")[0] for name in times} & set(HEAVY_MODULES)),
+        "slowest": [
+            (name, round(cumulative / 1000, 1))
+            for name, (_, cumulative) in sorted(times.items(), key=lambda item: -item[1][1])
+            if name != module and "." not in name
+        ][:5],
+    }
+
+
+def check_budgets(budgets=None):
+    report = []
+    for module, budget_ms in (budgets or IMPORT_BUDGETS_MS).items():
+        row = measure_import(module)
+        row["budget_ms"] = budget_ms
+        row["within_budget"] = row["ok"] and row["ms"] <= budget_ms and not row["heavy"]
+        report.append(row)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check cold import times against the startup budget.")
+    parser.add_argument("modules", nargs="*", help="only check these modules")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    budgets = {module: IMPORT_BUDGETS_MS.get(module, 1000) for module in args.modules} or None
+    report = check_budgets(budgets)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for row in report:
+            status = "✅" if row["within_budget"] else "❌"
+            heavy = f"  loads {', '.join(row['heavy'])}" if row["heavy"] else ""
+            print(f"{status} {row['module']:<22} {row['ms']:>8.1f} ms / {row['budget_ms']} ms{heavy}")
+            if not row["within_budget"]:
+                print("     slowest: " + ", ".join(f"{name} {ms} ms" for name, ms in row["slowest"]))
+    sys.exit(0 if all(row["within_budget"] for row in report) else 1)
+
+
+if __name__ == "__main__":
+    main()
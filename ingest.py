@@ -0,0 +1,312 @@
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+
+from job_dedup import LSHIndex, job_words, minhash
+from job_feeds import normalize_adzuna_job, normalize_remotive_job, parse_posted_at
+
+# Streaming import of job postings into jobs.db. Every stage is a generator, so
+# only one batch is in memory however large the input is:
+#
+#   read (JSONL files or live feeds) -> normalize -> dedupe (exact and
+#     near-duplicate) -> batch
+#     -> write (bulk insert, TF-IDF and embedding indexing) -> checkpoint
+#
+# Rows need their database ids before they can be vectorized into the index,
+# so each batch is vectorized right after it is written.
+BATCH_SIZE = 1000
+# Keys remembered for in-stream deduplication; older duplicates are still
+# caught by the unique feed_key index when written
+DEDUPE_WINDOW = 100000
+# Postings kept for near-duplicate checks (MinHash signature plus LSH bucket
+# entries, roughly 3 KB each)
+NEAR_DUPLICATE_WINDOW = 10000
+CHECKPOINT_FILE = "ingest_checkpoint.json"
+PROGRESS_SECONDS = 5
+IMPORT_FEED = "import"
+
+
+class StageStats:
+    # Items produced and time spent per stage. A stage's time includes the
+    # stages upstream of it, so exclusive time is the difference.
+    def __init__(self, names):
+        self.names = names
+        self.items = dict.fromkeys(names, 0)
+        self.seconds = dict.fromkeys(names, 0.0)
+        self.started = time.perf_counter()
+
+    def timed(self, name, stage, count=None):
+        iterator = iter(stage)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.seconds[name] += time.perf_counter() - start
+                return
+            self.seconds[name] += time.perf_counter() - start
+            self.items[name] += count(item) if count else 1
+            yield item
+
+    def report(self):
+        rows, upstream = [], 0.0
+        for name in self.names:
+            exclusive = max(self.seconds[name] - upstream, 0.0)
+            upstream = self.seconds[name]
+            rows.append({
+                "stage": name,
+                "items": self.items[name],
+                "seconds": round(exclusive, 3),
+                "items_per_second": round(self.items[name] / exclusive, 1) if exclusive else None,
+            })
+        return {"elapsed": round(time.perf_counter() - self.started, 3), "stages": rows}
+
+
+def _open(path):
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def _fingerprint(paths):
+    return [[os.path.abspath(path), os.path.getsize(path)] for path in paths]
+
+
+def read_jsonl(paths, start=None, end=None):
+    # Yields (position, record); position (file index, byte offset after the
+    # line) is what the checkpoint stores. Bad lines are skipped. end, a dict,
+    # gets the position after the last line read, skipped or not.
+    file_index, offset = start or (0, 0)
+    for i in range(file_index, len(paths)):
+        with _open(paths[i]) as f:
+            if i == file_index and offset:
+                f.seek(offset)
+            for line in iter(f.readline, b""):
+                position = (i, f.tell())
+                if end is not None:
+                    end["position"] = position
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict):
+                    yield position, record
+
+
+def read_feeds(keyword, pages):
+    # Live Adzuna and Remotive postings; not resumable
+    from job_feeds import iter_jobs
+
+    for _, jobs in iter_jobs(keyword, adzuna_pages=pages):
+        for job in jobs:
+            yield None, job
+
+
+def normalize_record(record, default_source=""):
+    # Accepts postings already normalized by job_feeds, raw Adzuna or Remotive
+    # API results, or plain dicts with title/description/company/location.
+    if "redirect_url" in record and "source" in record:
+        job = dict(record)
+    elif "publication_date" in record or "candidate_required_location" in record:
+        job = normalize_remotive_job(record)
+    elif isinstance(record.get("location"), dict):
+        job = normalize_adzuna_job(record)
+        job["company"] = (record.get("company") or {}).get("display_name", "")
+    else:
+        job = {
+            "title": record.get("title", ""),
+            "description": record.get("description", ""),
+            "redirect_url": record.get("redirect_url") or record.get("url", ""),
+            "source": record.get("source") or default_source,
+            "created": record.get("created") or record.get("post_date", ""),
+            "location": record.get("location", ""),
+        }
+    job.setdefault("company", record.get("company_name") or record.get("company") or "")
+    if isinstance(job["company"], dict):
+        job["company"] = job["company"].get("display_name", "")
+    if not job.get("title") or not job.get("description"):
+        return None
+    job["posted_at"] = job.get("posted_at") or parse_posted_at(job.get("created"))
+    return job
+
+
+def normalize(records, default_source=""):
+    for position, record in records:
+        job = normalize_record(record, default_source)
+        if job is not None:
+            yield position, job
+
+
+def dedupe(jobs, window=DEDUPE_WINDOW, near_window=NEAR_DUPLICATE_WINDOW):
+    # Drops postings whose feed_key was seen in the last `window` keys, and
+    # reworded reposts of any of the last `near_window` postings
+    from job_database import feed_key
+
+    seen = OrderedDict()
+    near = LSHIndex(window=near_window)
+    for position, job in jobs:
+        key = feed_key(job)
+        if key in seen:
+            seen.move_to_end(key)
+            continue
+        seen[key] = None
+        if len(seen) > window:
+            seen.popitem(last=False)
+        signature = minhash(job_words(job))
+        if near.find(signature) is not None:
+            continue
+        near.add(key, signature)
+        yield position, job
+
+
+def batches(jobs, size=BATCH_SIZE):
+    batch = []
+    for item in jobs:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write(batches_in, feed=IMPORT_FEED):
+    # Bulk insert plus TF-IDF / embedding indexing of each batch; yields the
+    # batch with the number of rows that were new
+    from job_database import insert_jobs
+
+    for batch in batches_in:
+        new_rows = insert_jobs([job for _, job in batch], feed, int(time.time()))
+        yield batch, len(new_rows)
+
+
+def load_checkpoint(path, paths):
+    if not os.path.isfile(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    # Only valid for the same inputs; a grown last file is fine (appended dump)
+    known = checkpoint.get("inputs", [])
+    current = _fingerprint(paths)
+    if len(known) != len(current) or any(
+            a[0] != b[0] or a[1] > b[1] for a, b in zip(known, current)):
+        return None
+    return checkpoint
+
+
+def save_checkpoint(path, paths, position, written, done=False):
+    # A finished import keeps its final position too, so postings appended to
+    # the last file later are picked up from there
+    checkpoint = {"inputs": _fingerprint(paths), "position": list(position) if position else None,
+                  "written": written, "done": done}
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+def ingest(paths=None, keyword=None, pages=3, batch_size=BATCH_SIZE, checkpoint_path=CHECKPOINT_FILE,
+           restart=False, default_source="", progress=None):
+    # Runs the pipeline. JSONL inputs resume from checkpoint_path unless
+    # restart is set. Returns the per-stage report.
+    from job_database import create_job_table
+
+    create_job_table()
+    names = ["read", "normalize", "dedupe", "batch", "write"]
+    stats = StageStats(names)
+    written = 0
+    end = {}
+    if paths:
+        checkpoint = None if restart else load_checkpoint(checkpoint_path, paths)
+        if checkpoint and checkpoint["done"] and (
+                not checkpoint["position"] or checkpoint["inputs"] == _fingerprint(paths)):
+            return dict(stats.report(), written=0, resumed_from=None, already_done=True)
+        start = tuple(checkpoint["position"]) if checkpoint and checkpoint["position"] else None
+        written = checkpoint["written"] if checkpoint else 0
+        if checkpoint:
+            # The interrupted run may have stored its last batch without indexing it
+            from job_database import index_missing_rows
+
+            index_missing_rows()
+        source = read_jsonl(paths, start, end)
+    else:
+        start = None
+        source = read_feeds(keyword, pages)
+
+    stream = stats.timed("read", source)
+    stream = stats.timed("normalize", normalize(stream, default_source))
+    stream = stats.timed("dedupe", dedupe(stream))
+    stream = stats.timed("batch", batches(stream, batch_size), len)
+    stream = stats.timed("write", write(stream), lambda item: len(item[0]))
+
+    last_report = time.perf_counter()
+    for batch, new in stream:
+        written += new
+        position = batch[-1][0]
+        if paths and position:
+            save_checkpoint(checkpoint_path, paths, position, written)
+        if progress and time.perf_counter() - last_report >= PROGRESS_SECONDS:
+            progress(stats.report(), written)
+            last_report = time.perf_counter()
+    if paths:
+        save_checkpoint(checkpoint_path, paths, end.get("position", start), written, done=True)
+    # An ANN index build started by the import finishes before the process
+    # exits; new vocabulary is lemmatized here rather than on every append
+    from job_ann import wait_for_ann_build
+    from job_index import update_lemmas
+
+    wait_for_ann_build()
+    update_lemmas()
+    return dict(stats.report(), written=written, resumed_from=start, already_done=False)
+
+
+def expire_jobs(days):
+    # Deletes postings posted more than days ago (posted_at) from jobs.db and
+    # tombstones them in the search indexes. Returns how many were removed.
+    from job_database import create_job_table, delete_expired_jobs
+
+    create_job_table()
+    return delete_expired_jobs(int(time.time()) - days * 86400)
+
+
+def _print_progress(report, written):
+    rates = ", ".join(f"{row['stage']} {row['items']}" for row in report["stages"])
+    print(f"… {report['elapsed']:.0f}s: {rates}; {written} new jobs", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream job postings into jobs.db.")
+    parser.add_argument("paths", nargs="*", help="JSONL files (optionally .gz), one posting per line")
+    parser.add_argument("--fetch", metavar="KEYWORD", help="import live Adzuna/Remotive postings instead")
+    parser.add_argument("--pages", type=int, default=3, help="Adzuna pages to fetch")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE)
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start over")
+    parser.add_argument("--source", default="", help="source name for records that do not carry one")
+    parser.add_argument("--expire-days", type=int, metavar="DAYS",
+                        help="afterwards, delete postings posted more than DAYS ago (can be used alone)")
+    args = parser.parse_args()
+    if not args.paths and not args.fetch and args.expire_days is None:
+        parser.error("give JSONL paths, --fetch KEYWORD or --expire-days DAYS")
+
+    if args.paths or args.fetch:
+        report = ingest(args.paths, args.fetch, args.pages, args.batch_size, args.checkpoint, args.restart,
+                        args.source, _print_progress)
+        if report["already_done"]:
+            print(f"ℹ️ Already imported (see {args.checkpoint}); use --restart to import again")
+        else:
+            for row in report["stages"]:
+                rate = f"{row['items_per_second']:>10.1f}/s" if row["items_per_second"] else " " * 12
+                print(f"{row['stage']:<10} {row['items']:>10} items {row['seconds']:>9.2f}s {rate}")
+            print(f"✅ {report['written']} new jobs in {report['elapsed']:.1f}s")
+    if args.expire_days is not None:
+        print(f"🗑️ {expire_jobs(args.expire_days)} jobs posted more than {args.expire_days} days ago removed")
+
+
+if __name__ == "__main__":
+    main()
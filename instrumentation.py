@@ -0,0 +1,186 @@
+import contextlib
+import contextvars
+import functools
+import os
+import threading
+import time
+
+# Span timings for the hot paths. Every span feeds process-wide latency
+# histograms (exported in Prometheus text format); spans that run inside a
+# request started with begin_request() are also collected into that request's
+# waterfall. Only the standard library is imported here.
+METRIC_PREFIX = "resume_matcher"
+# Histogram bucket bounds in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROFILE_LINES = 40
+# Serve /metrics on this port when set (see start_metrics_server)
+METRICS_PORT = os.getenv("METRICS_PORT")
+
+_trace = contextvars.ContextVar("trace", default=None)
+_metrics = {}
+_metrics_lock = threading.Lock()
+_server = {"httpd": None}
+
+
+def _observe(name, seconds, error=False):
+    with _metrics_lock:
+        metric = _metrics.setdefault(name, {"count": 0, "sum": 0.0, "errors": 0, "buckets": [0] * len(BUCKETS)})
+        metric["count"] += 1
+        metric["sum"] += seconds
+        metric["errors"] += bool(error)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                metric["buckets"][i] += 1
+
+
+class span:
+    # Times a block (with span("name"):) or every call of a function
+    # (@span("name"))
+    def __init__(self, name):
+        self.name = name
+        self.record = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        trace = _trace.get()
+        if trace is not None:
+            self.record = {"name": self.name, "start_ms": (self.start - trace["start"]) * 1000,
+                           "depth": trace["depth"]}
+            trace["depth"] += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        _observe(self.name, seconds, exc_type is not None)
+        trace = _trace.get()
+        if trace is not None and self.record is not None:
+            trace["depth"] -= 1
+            self.record["duration_ms"] = seconds * 1000
+            self.record["error"] = exc_type is not None
+            trace["spans"].append(self.record)
+        return False
+
+    def __call__(self, func):
+        name = self.name
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+
+def begin_request(name):
+    # Starts collecting spans for the current thread / context
+    trace = {"name": name, "start": time.perf_counter(), "depth": 0, "spans": []}
+    _trace.set(trace)
+    return trace
+
+
+def end_request():
+    # Stops collecting and returns the waterfall: spans in start order with
+    # start offset, duration and nesting depth, plus the request total
+    trace = _trace.get()
+    if trace is None:
+        return None
+    _trace.set(None)
+    total = time.perf_counter() - trace["start"]
+    _observe(f"request.{trace['name']}", total)
+    spans = sorted(trace["spans"], key=lambda record: record["start_ms"])
+    return {"name": trace["name"], "total_ms": total * 1000, "spans": spans}
+
+
+def span_stats():
+    with _metrics_lock:
+        return {name: dict(metric, buckets=list(metric["buckets"])) for name, metric in _metrics.items()}
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text():
+    # Prometheus text exposition format (version 0.0.4)
+    name = f"{METRIC_PREFIX}_span_seconds"
+    lines = [f"# HELP {name} Time spent in instrumented calls.", f"# TYPE {name} histogram"]
+    errors = [f"# HELP {METRIC_PREFIX}_span_errors_total Instrumented calls that raised.",
+              f"# TYPE {METRIC_PREFIX}_span_errors_total counter"]
+    for span_name, metric in sorted(span_stats().items()):
+        label = f'span="{_label(span_name)}"'
+        for bound, count in zip(BUCKETS, metric["buckets"]):
+            lines.append(f'{name}_bucket{{{label},le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{label},le="+Inf"}} {metric["count"]}')
+        lines.append(f"{name}_sum{{{label}}} {metric['sum']:.6f}")
+        lines.append(f"{name}_count{{{label}}} {metric['count']}")
+        errors.append(f"{METRIC_PREFIX}_span_errors_total{{{label}}} {metric['errors']}")
+    return "\n".join(lines + errors) + "\n"
+
+
+def start_metrics_server(port=None):
+    # Serves prometheus_text() at /metrics from a daemon thread, once per process
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    port = int(port or METRICS_PORT or 0)
+    if _server["httpd"] is not None or not port:
+        return _server["httpd"]
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=httpd.serve_forever, name="metrics", daemon=True).start()
+    _server["httpd"] = httpd
+    return httpd
+
+
+@contextlib.contextmanager
+def profile(mode="cprofile"):
+    # Profiles the enclosed block; the text report is in result["report"]
+    # afterwards. pyinstrument is used when asked for and installed.
+    result = {"mode": mode, "report": ""}
+    if mode == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            result["mode"] = mode = "cprofile"
+    if mode == "pyinstrument":
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield result
+        finally:
+            profiler.stop()
+            result["report"] = profiler.output_text(unicode=True)
+        return
+
+    import cProfile
+    import io
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield result
+    finally:
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_LINES)
+        result["report"] = out.getvalue()
@@ -0,0 +1,335 @@
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+
+from array_store import (alive_mask, append_array, delete_ids, deleted_ids, load_cached, memmap, path, read_meta,
+                         recover_arrays, write_array, write_meta)
+from file_lock import locked
+from matching import top_k_indices
+
+# Approximate nearest-neighbour index over the job embeddings (job_embeddings).
+# IVF with product quantization: a coarse k-means assigns each job to one of
+# nlist lists, and the residual from that list's centroid is stored as m one-byte
+# codes. A query only scans the nprobe closest lists, scoring codes through a
+# lookup table, and the best candidates are re-scored exactly. Stored as an
+# array_store directory.
+ANN_DIR = "jobs_ann"
+
+CENTROIDS_FILE = "centroids.npy"
+CODEBOOKS_FILE = "codebooks.npy"
+ARRAYS = {
+    "ids": np.int64,
+    "lists": np.int32,
+    "codes": np.uint8,
+    # Tombstones for deleted (expired) jobs
+    "deleted": np.int64,
+}
+# Below this many jobs brute force is fast enough and no index is built
+ANN_MIN_DOCS = 2000
+# Rebuild the quantizers once the index has grown this much since training
+RETRAIN_FACTOR = 4
+SUBQUANTIZERS = 30
+CODEBOOK_SIZE = 256
+TRAIN_SAMPLE = 20000
+KMEANS_ITERATIONS = 10
+NPROBE = 8
+# Exact re-scoring of top_n * REFINE_FACTOR candidates; 0 returns PQ scores
+REFINE_FACTOR = 16
+ASSIGN_CHUNK = 65536
+
+_loaded = {"key": None, "value": None}
+_builder = {"thread": None}
+_builder_lock = threading.Lock()
+
+
+def _nearest(x, centroids):
+    # argmin of squared distance, in chunks to bound the score matrix
+    half_norms = 0.5 * (centroids ** 2).sum(axis=1)
+    assign = np.empty(len(x), dtype=np.int32)
+    for start in range(0, len(x), ASSIGN_CHUNK):
+        chunk = np.asarray(x[start:start + ASSIGN_CHUNK], dtype=np.float32)
+        assign[start:start + len(chunk)] = np.argmax(chunk @ centroids.T - half_norms, axis=1)
+    return assign
+
+
+def _kmeans(x, k, seed=0):
+    from scipy.sparse import csr_matrix
+
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assign = _nearest(x, centroids)
+        one_hot = csr_matrix((np.ones(len(x), dtype=np.float32), (assign, np.arange(len(x)))), shape=(k, len(x)))
+        counts = np.bincount(assign, minlength=k)
+        filled = counts > 0
+        centroids[filled] = (one_hot @ x)[filled] / counts[filled, None]
+        # Empty clusters are re-seeded from random points
+        if not filled.all():
+            centroids[~filled] = x[rng.choice(len(x), int((~filled).sum()), replace=False)]
+    return centroids
+
+
+def _subquantizers(dim):
+    # Largest m <= SUBQUANTIZERS that splits the vector evenly
+    return next(m for m in range(min(SUBQUANTIZERS, dim), 0, -1) if dim % m == 0)
+
+
+def _encode(x, lists, centroids, codebooks):
+    m, _, dsub = codebooks.shape
+    codes = np.empty((len(x), m), dtype=np.uint8)
+    for start in range(0, len(x), ASSIGN_CHUNK):
+        chunk = np.asarray(x[start:start + ASSIGN_CHUNK], dtype=np.float32)
+        residuals = chunk - centroids[lists[start:start + len(chunk)]]
+        for j in range(m):
+            codes[start:start + len(chunk), j] = _nearest(residuals[:, j * dsub:(j + 1) * dsub], codebooks[j])
+    return codes
+
+
+def build_ann(ids, vectors, ann_dir=ANN_DIR, deleted=(), store_docs=None):
+    # Trains the quantizers on a sample of the vectors and encodes all of them.
+    # deleted carries tombstones over from the previous index; store_docs is
+    # how many embedding store rows the index covers (see sync_ann).
+    with locked(ann_dir):
+        _build_ann(ids, vectors, ann_dir, deleted, store_docs)
+
+
+def _build_ann(ids, vectors, ann_dir, deleted, store_docs=None):
+    ids = np.asarray(ids, dtype=np.int64)
+    deleted = np.asarray(deleted, dtype=np.int64)
+    n_docs, dim = vectors.shape
+    os.makedirs(ann_dir, exist_ok=True)
+    rng = np.random.default_rng(0)
+    sample = np.asarray(vectors[np.sort(rng.choice(n_docs, min(n_docs, TRAIN_SAMPLE), replace=False))],
+                        dtype=np.float32)
+
+    nlist = max(1, min(int(np.sqrt(n_docs)), len(sample) // 39))
+    centroids = _kmeans(sample, nlist)
+    m = _subquantizers(dim)
+    dsub = dim // m
+    ksub = min(CODEBOOK_SIZE, len(sample))
+    residuals = sample - centroids[_nearest(sample, centroids)]
+    codebooks = np.stack([_kmeans(residuals[:, j * dsub:(j + 1) * dsub], ksub, seed=j) for j in range(m)])
+
+    lists = _nearest(vectors, centroids)
+    codes = _encode(vectors, lists, centroids, codebooks)
+    np.save(path(ann_dir, CENTROIDS_FILE), centroids)
+    np.save(path(ann_dir, CODEBOOKS_FILE), codebooks)
+    for name, values in (("ids", ids), ("lists", lists), ("codes", codes), ("deleted", deleted)):
+        write_array(ann_dir, name, values, ARRAYS[name])
+    write_meta(ann_dir, {"n_docs": n_docs, "n_deleted": len(deleted), "trained_docs": n_docs, "nlist": nlist, "m": m,
+                         "ksub": ksub, "dim": dim, "store_docs": n_docs if store_docs is None else store_docs})
+
+
+def rebuild_ann(ann_dir=ANN_DIR, store=None):
+    with locked(ann_dir):
+        return _rebuild_ann(ann_dir, store)
+
+
+def _rebuild_ann(ann_dir, store):
+    if store is None:
+        from job_embeddings import load_embeddings
+
+        store = load_embeddings()
+    if store is None or store["n_docs"] < ANN_MIN_DOCS:
+        return False
+    deleted = load_ann(ann_dir)["deleted"] if read_meta(ann_dir) else np.zeros(0, dtype=np.int64)
+    alive = ~np.isin(store["ids"], deleted)
+    if store["alive"] is not None:
+        alive &= store["alive"]
+    _build_ann(store["ids"][alive], store["vectors"][alive], ann_dir, deleted, store["n_docs"])
+    return True
+
+
+def rebuild_ann_in_background(ann_dir=ANN_DIR):
+    # Training takes seconds on a large store, too long for a request that
+    # adds a job; searches use brute force (or the old index) meanwhile. At
+    # most one build runs at a time.
+    with _builder_lock:
+        thread = _builder["thread"]
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(target=_background_build, args=(ann_dir,), name="ann-build", daemon=True)
+            thread.start()
+            _builder["thread"] = thread
+        return thread
+
+
+def _background_build(ann_dir):
+    from job_embeddings import load_embeddings
+
+    try:
+        rebuild_ann(ann_dir)
+        # Rows stored while the build ran
+        store = load_embeddings()
+        if store is not None and read_meta(ann_dir) is not None:
+            _append_store_rows(store, ann_dir)
+    except Exception as e:
+        print(f"❌ ANN index build failed: {e}")
+
+
+def wait_for_ann_build():
+    # For CLIs (ingest.py) that exit right after adding jobs
+    thread = _builder["thread"]
+    if thread is not None:
+        thread.join()
+
+
+def sync_ann(store, ann_dir=ANN_DIR):
+    # Brings the index up to date with the embedding store (load_embeddings()):
+    # store rows past the ones it covers are encoded with the current
+    # quantizers. Building the index, the first time the store reaches
+    # ANN_MIN_DOCS or once it has grown RETRAIN_FACTOR times since training,
+    # happens in the background.
+    meta = read_meta(ann_dir)
+    if meta is None:
+        if store["n_docs"] >= ANN_MIN_DOCS:
+            rebuild_ann_in_background(ann_dir)
+        return
+    if _append_store_rows(store, ann_dir):
+        rebuild_ann_in_background(ann_dir)
+
+
+def _append_store_rows(store, ann_dir):
+    # Returns True when the index needs retraining
+    with locked(ann_dir):
+        meta = read_meta(ann_dir)
+        _recover(ann_dir, meta)
+        start = meta.get("store_docs")
+        if start is None or start > store["n_docs"]:
+            # Built by an older version, or the store was rebuilt since
+            return True
+        rows = np.arange(start, store["n_docs"])
+        if store["alive"] is not None:
+            rows = rows[store["alive"][rows]]
+        if len(rows):
+            ids = store["ids"][rows]
+            vectors = np.asarray(store["vectors"][rows], dtype=np.float32)
+            centroids = np.load(path(ann_dir, CENTROIDS_FILE))
+            codebooks = np.load(path(ann_dir, CODEBOOKS_FILE))
+            lists = _nearest(vectors, centroids)
+            arrays = {"ids": ids, "lists": lists, "codes": _encode(vectors, lists, centroids, codebooks)}
+            for name, values in arrays.items():
+                append_array(ann_dir, name, values, ARRAYS[name])
+        meta["n_docs"] += len(rows)
+        meta["store_docs"] = store["n_docs"]
+        write_meta(ann_dir, meta)
+        return meta["n_docs"] > RETRAIN_FACTOR * meta["trained_docs"]
+
+
+def delete_from_ann(job_ids, ann_dir=ANN_DIR):
+    delete_ids(ann_dir, job_ids, _recover)
+
+
+def _recover(ann_dir, meta):
+    # Back to the lengths meta.json committed, so appends stay row-aligned
+    n_docs = meta["n_docs"]
+    recover_arrays(ann_dir, meta, ARRAYS, {"ids": n_docs, "lists": n_docs, "codes": n_docs * meta["m"]})
+
+
+def _memmap(name, ann_dir, length, width=None):
+    return memmap(ann_dir, name, ARRAYS[name], length, width)
+
+
+def load_ann(ann_dir=ANN_DIR):
+    return load_cached(ann_dir, _loaded, lambda meta: _load_ann(ann_dir, meta))
+
+
+def _load_ann(ann_dir, meta):
+    n_docs = meta["n_docs"]
+    ids = _memmap("ids", ann_dir, n_docs)
+    lists = _memmap("lists", ann_dir, n_docs)
+    deleted = deleted_ids(ann_dir, meta)
+    # Rows grouped by list once per load; each list is then one slice
+    order = np.argsort(lists, kind="stable").astype(np.int64)
+    list_ptr = np.concatenate([[0], np.cumsum(np.bincount(lists, minlength=meta["nlist"]))])
+    return dict(
+        meta,
+        ids=ids,
+        lists=lists,
+        codes=_memmap("codes", ann_dir, n_docs, meta["m"]),
+        deleted=deleted,
+        alive=alive_mask(ids, deleted),
+        order=order,
+        list_ptr=list_ptr,
+        centroids=np.load(path(ann_dir, CENTROIDS_FILE)),
+        codebooks=np.load(path(ann_dir, CODEBOOKS_FILE)),
+    )
+
+
+def ann_search(index, query, top_n=10, nprobe=NPROBE, refine=REFINE_FACTOR, store=None):
+    # [(job_id, score), ...] best first for an L2-normalized query vector.
+    # With store (job_embeddings.load_embeddings()) and refine > 0 the best
+    # PQ candidates are re-scored with the exact vectors.
+    coarse = index["centroids"] @ query
+    probes = top_k_indices(coarse, nprobe)
+    rows = np.concatenate([index["order"][index["list_ptr"][p]:index["list_ptr"][p + 1]] for p in probes])
+    if index["alive"] is not None:
+        rows = rows[index["alive"][rows]]
+    if not len(rows) or not top_n:
+        return []
+
+    m, _, dsub = index["codebooks"].shape
+    lut = np.einsum("jkd,jd->jk", index["codebooks"], query.reshape(m, dsub))
+    scores = coarse[index["lists"][rows]] + lut[np.arange(m), index["codes"][rows]].sum(axis=1)
+
+    if refine and store is not None:
+        best = rows[top_k_indices(scores, top_n * refine)]
+        from job_embeddings import store_rows
+
+        vector_rows = store_rows(store, index["ids"][best])
+        keep = vector_rows >= 0
+        rows = best[keep]
+        scores = store["vectors"][vector_rows[keep]] @ query
+    return [(int(index["ids"][rows[i]]), float(scores[i])) for i in top_k_indices(scores, top_n)]
+
+
+def recall_report(k=10, nprobes=(1, 2, 4, 8, 16, 32), n_queries=100, refine=REFINE_FACTOR, ann_dir=ANN_DIR):
+    # recall@k of ann_search against the exact brute-force ranking, with
+    # timings, for each nprobe. Queries are stored job vectors.
+    from job_embeddings import load_embeddings
+
+    store, index = load_embeddings(), load_ann(ann_dir)
+    if store is None or index is None:
+        return []
+    alive = ~np.isin(store["ids"], index["deleted"])
+    if store["alive"] is not None:
+        alive &= store["alive"]
+    ids, vectors = store["ids"][alive], store["vectors"][alive]
+    rng = np.random.default_rng(0)
+    queries = np.asarray(vectors[rng.choice(len(vectors), min(n_queries, len(vectors)), replace=False)])
+
+    start = time.perf_counter()
+    exact = [set(ids[top_k_indices(vectors @ query, k)].tolist()) for query in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    report = []
+    for nprobe in nprobes:
+        start = time.perf_counter()
+        found = [{job_id for job_id, _ in ann_search(index, query, k, nprobe, refine, store)} for query in queries]
+        ann_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        recall = np.mean([len(a & e) / max(len(e), 1) for a, e in zip(found, exact)])
+        report.append({"k": k, "nprobe": nprobe, "refine": refine, "recall": round(float(recall), 4),
+                       "ann_ms": round(ann_ms, 3), "exact_ms": round(exact_ms, 3)})
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the job ANN index and report recall@k.")
+    parser.add_argument("--rebuild", action="store_true", help="retrain and re-encode from the embedding store")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--refine", type=int, default=REFINE_FACTOR)
+    args = parser.parse_args()
+
+    if args.rebuild and not rebuild_ann():
+        print(f"Fewer than {ANN_MIN_DOCS} embedded jobs, no index built.")
+        return
+    for row in recall_report(args.k, n_queries=args.queries, refine=args.refine):
+        print(f"nprobe={row['nprobe']:>3}  recall@{row['k']}={row['recall']:.3f}  "
+              f"ann={row['ann_ms']:.2f} ms  exact={row['exact_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
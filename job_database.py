@@ -1,7 +1,31 @@
+import hashlib
 import sqlite3
 
+from db_utils import open_connection
+from job_ann import delete_from_ann
+from job_embeddings import add_embeddings, delete_embeddings, hybrid_search, max_embedded_id, semantic_available
+from job_index import add_to_index, delete_from_index, max_indexed_id, search_index
+
+DB_PATH = "jobs.db"
+JOB_COLUMNS = ["title", "description", "company", "location", "post_date"]
+ITER_BATCH_SIZE = 500
+
+# Columns used by cached job-feed postings, added to older jobs.db files in place
+FEED_COLUMNS = {
+    "source": "TEXT",
+    "redirect_url": "TEXT",
+    "created": "TEXT",
+    "posted_at": "INTEGER",
+    "feed": "TEXT",
+    "feed_key": "TEXT",
+    "seen_at": "INTEGER",
+}
+
+def get_connection():
+    return open_connection(DB_PATH)
+
 def create_job_table():
-    conn = sqlite3.connect("jobs.db")
+    conn = get_connection()
     c = conn.cursor()
     c.execute('''CREATE TABLE IF NOT EXISTS jobs (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -11,21 +35,235 @@ def create_job_table():
                     location TEXT,
                     post_date TEXT
                 )''')
+    existing = {row[1] for row in c.execute("PRAGMA table_info(jobs)")}
+    for column, column_type in FEED_COLUMNS.items():
+        if column not in existing:
+            c.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_post_date ON jobs (post_date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_location ON jobs (location)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_company ON jobs (company)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_posted_at ON jobs (posted_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_feed_seen ON jobs (feed, seen_at)")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_feed_key ON jobs (feed_key)")
+    c.execute('''CREATE TABLE IF NOT EXISTS feed_state (
+                    feed TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at INTEGER,
+                    updated_at INTEGER
+                )''')
     conn.commit()
-    conn.close()
+
+def _index_rows(rows):
+    # New (id, description) rows go into the TF-IDF index and, when the
+    # vectors model is installed, the embedding store
+    add_to_index(rows)
+    add_embeddings(rows)
+
+def index_missing_rows():
+    # Rows committed by an insert that died before _index_rows: job ids only
+    # grow, so they are the rows above each store's highest id. Returns how
+    # many rows were indexed.
+    conn = get_connection()
+    stores = [(add_to_index, max_indexed_id())]
+    if semantic_available():
+        stores.append((add_embeddings, max_embedded_id()))
+    indexed = 0
+    for add, last_id in stores:
+        rows = conn.execute("SELECT id, description FROM jobs WHERE id > ? ORDER BY id", (last_id,)).fetchall()
+        if rows:
+            add(rows)
+            indexed = max(indexed, len(rows))
+    return indexed
 
 def add_job(title, description, company, location, post_date):
-    conn = sqlite3.connect("jobs.db")
-    c = conn.cursor()
-    c.execute("INSERT INTO jobs (title, description, company, location, post_date) VALUES (?, ?, ?, ?, ?)",
-              (title, description, company, location, post_date))
-    conn.commit()
-    conn.close()
+    conn = get_connection()
+    with conn:
+        c = conn.execute("INSERT INTO jobs (title, description, company, location, post_date) VALUES (?, ?, ?, ?, ?)",
+                         (title, description, company, location, post_date))
+    job_id = c.lastrowid
+    _index_rows([(job_id, description)])
+    return job_id
+
+def add_jobs(jobs):
+    # Bulk insert of (title, description, company, location, post_date) tuples
+    # or dicts with those keys, in a single transaction. Returns the new ids.
+    rows = (
+        tuple(job[column] for column in JOB_COLUMNS) if isinstance(job, dict) else tuple(job)
+        for job in jobs
+    )
+    conn = get_connection()
+    with conn:
+        # BEGIN IMMEDIATE takes the write lock, so ids above the current
+        # maximum are exactly the rows inserted here
+        conn.execute("BEGIN IMMEDIATE")
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM jobs").fetchone()[0]
+        conn.executemany("INSERT INTO jobs (title, description, company, location, post_date) VALUES (?, ?, ?, ?, ?)",
+                         rows)
+        new_rows = conn.execute("SELECT id, description FROM jobs WHERE id > ? ORDER BY id", (last_id,)).fetchall()
+    if new_rows:
+        _index_rows(new_rows)
+    return [job_id for job_id, _ in new_rows]
+
+def delete_jobs(job_ids):
+    # Removes postings from the table and tombstones them in the TF-IDF index,
+    # the embedding store and the ANN index, so searches skip them before
+    # taking the top k. The next rebuild drops them for good.
+    job_ids = list(job_ids)
+    if not job_ids:
+        return 0
+    conn = get_connection()
+    with conn:
+        conn.executemany("DELETE FROM jobs WHERE id = ?", ((job_id,) for job_id in job_ids))
+    delete_from_index(job_ids)
+    delete_embeddings(job_ids)
+    delete_from_ann(job_ids)
+    return len(job_ids)
+
+def delete_expired_jobs(posted_before):
+    # Postings whose posted_at epoch is older than posted_before
+    rows = get_connection().execute("SELECT id FROM jobs WHERE posted_at < ?", (posted_before,)).fetchall()
+    return delete_jobs(row[0] for row in rows)
+
+def iter_jobs(filters=None, limit=None, offset=0):
+    # Yields job rows newest first without loading the table into memory.
+    # filters maps a column to a value (equality) or a list/tuple (IN).
+    known = {"id", *JOB_COLUMNS, *FEED_COLUMNS}
+    clauses, params = [], []
+    for column, value in (filters or {}).items():
+        if column not in known:
+            raise ValueError(f"Unknown job column: {column}")
+        if isinstance(value, (list, tuple, set)):
+            clauses.append(f"{column} IN ({','.join('?' for _ in value)})")
+            params.extend(value)
+        else:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+
+    query = "SELECT * FROM jobs"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY post_date DESC LIMIT ? OFFSET ?"
+    params += [-1 if limit is None else limit, offset]
+
+    c = get_connection().execute(query, params)
+    while True:
+        batch = c.fetchmany(ITER_BATCH_SIZE)
+        if not batch:
+            break
+        yield from batch
 
 def get_all_jobs():
-    conn = sqlite3.connect("jobs.db")
+    return list(iter_jobs())
+
+def search_jobs(resume_text, top_k=10, locations=None, semantic_weight=0.0, as_dicts=False):
+    # as_dicts returns each job as a column -> value dict instead of a tuple
+    c = get_connection().cursor()
+    if as_dicts:
+        c.row_factory = sqlite3.Row
+    allowed_ids = None
+    if locations:
+        where = " OR ".join("location LIKE ?" for _ in locations)
+        c.execute(f"SELECT id FROM jobs WHERE {where}", [f"%{loc}%" for loc in locations])
+        allowed_ids = [row[0] for row in c.fetchall()]
+
+    if semantic_weight:
+        results = hybrid_search(resume_text, top_k, allowed_ids, semantic_weight)
+    else:
+        results = search_index(resume_text, top_k, allowed_ids=allowed_ids)
+    scores = dict(results)
+    jobs = []
+    if scores:
+        placeholders = ",".join("?" for _ in scores)
+        c.execute(f"SELECT * FROM jobs WHERE id IN ({placeholders})", list(scores))
+        jobs = c.fetchall()
+    jobs.sort(key=lambda job: scores[job[0]], reverse=True)
+    return [(dict(job) if as_dicts else job, scores[job[0]]) for job in jobs]
+
+def feed_key(job):
+    if job.get("redirect_url"):
+        return f"{job['source']}:{job['redirect_url']}"
+    content = f"{job.get('title', '')}\n{job.get('description', '')}"
+    return f"{job['source']}:" + hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+def save_feed_jobs(feed, jobs, seen_at):
+    # Upserts normalized postings (with a pre-parsed posted_at epoch) from one
+    # feed. New rows are added to the search index.
+    conn = get_connection()
     c = conn.cursor()
-    c.execute("SELECT * FROM jobs ORDER BY post_date DESC")
-    jobs = c.fetchall()
-    conn.close()
-    return jobs
+    new_rows = []
+    for job in jobs:
+        key = feed_key(job)
+        c.execute(
+            "INSERT OR IGNORE INTO jobs (title, description, company, location, post_date, source, "
+            "redirect_url, created, posted_at, feed, feed_key, seen_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job["title"], job["description"], job.get("company", ""), job["location"], job["created"],
+             job["source"], job["redirect_url"], job["created"], job.get("posted_at"), feed, key, seen_at))
+        if c.rowcount:
+            new_rows.append((c.lastrowid, job["description"]))
+        else:
+            c.execute("UPDATE jobs SET feed = ?, seen_at = ? WHERE feed_key = ?", (feed, seen_at, key))
+    conn.commit()
+    if new_rows:
+        _index_rows(new_rows)
+    return len(new_rows)
+
+def insert_jobs(jobs, feed=None, seen_at=None):
+    # Bulk insert of normalized postings in one transaction. Postings whose
+    # feed_key is already stored are skipped; new rows are indexed. Returns
+    # the new (id, description) rows.
+    rows = [
+        (job["title"], job["description"], job.get("company", ""), job.get("location", ""), job.get("created", ""),
+         job.get("source", ""), job.get("redirect_url", ""), job.get("created", ""), job.get("posted_at"),
+         feed, feed_key(job), seen_at)
+        for job in jobs
+    ]
+    conn = get_connection()
+    with conn:
+        # Write lock first, so ids above the current maximum are ours
+        conn.execute("BEGIN IMMEDIATE")
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM jobs").fetchone()[0]
+        conn.executemany(
+            "INSERT OR IGNORE INTO jobs (title, description, company, location, post_date, source, "
+            "redirect_url, created, posted_at, feed, feed_key, seen_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows)
+        new_rows = conn.execute("SELECT id, description FROM jobs WHERE id > ? ORDER BY id", (last_id,)).fetchall()
+    if new_rows:
+        _index_rows(new_rows)
+    return new_rows
+
+def get_feed_state(feeds):
+    c = get_connection().cursor()
+    c.row_factory = sqlite3.Row
+    placeholders = ",".join("?" for _ in feeds)
+    rows = c.execute(f"SELECT * FROM feed_state WHERE feed IN ({placeholders})", list(feeds)).fetchall()
+    return {row["feed"]: dict(row) for row in rows}
+
+def set_feed_state(feed, fetched_at, etag=None, last_modified=None, updated_at=None):
+    # updated_at is the time of the last 200 response; a 304 keeps the old one
+    conn = get_connection()
+    conn.execute(
+        "INSERT INTO feed_state (feed, etag, last_modified, fetched_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(feed) DO UPDATE SET fetched_at = excluded.fetched_at, "
+        "etag = COALESCE(excluded.etag, etag), last_modified = COALESCE(excluded.last_modified, last_modified), "
+        "updated_at = COALESCE(excluded.updated_at, updated_at)",
+        (feed, etag, last_modified, fetched_at, updated_at))
+    conn.commit()
+
+def get_feed_jobs(feeds, posted_since=None):
+    # Postings from the latest successful fetch of each feed, newest first.
+    # posted_since maps a source to the oldest posted_at epoch kept for it.
+    c = get_connection().cursor()
+    c.row_factory = sqlite3.Row
+    placeholders = ",".join("?" for _ in feeds)
+    query = (
+        "SELECT jobs.id, title, description, company, location, source, redirect_url, created, posted_at "
+        "FROM jobs JOIN feed_state ON jobs.feed = feed_state.feed "
+        f"WHERE jobs.feed IN ({placeholders}) AND jobs.seen_at >= feed_state.updated_at"
+    )
+    params = list(feeds)
+    for source, since in (posted_since or {}).items():
+        query += " AND (source != ? OR posted_at >= ?)"
+        params += [source, since]
+    rows = c.execute(query + " ORDER BY posted_at DESC", params).fetchall()
+    return [dict(row) for row in rows]
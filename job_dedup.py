@@ -0,0 +1,123 @@
+import hashlib
+import re
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from instrumentation import span
+
+# Near-duplicate postings (the same role reposted with small wording changes)
+# are found with MinHash signatures over word shingles and LSH banding: only
+# postings that share a whole band of their signature are compared, so a batch
+# is deduplicated in roughly linear time instead of pairwise.
+SHINGLE_SIZE = 3
+NUM_PERM = 128
+# 16 bands of 8 rows make pairs above ~0.7 Jaccard likely candidates; each
+# candidate is then confirmed against DUPLICATE_THRESHOLD
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+DUPLICATE_THRESHOLD = 0.8
+# Multiply-shift hashing: (a * x + b) mod 2**64, top 32 bits, one (a, b) pair
+# per permutation
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, 2 ** 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.randint(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+_SHIFT = np.uint64(32)
+_EMPTY = 2 ** 32 - 1
+_MIX = np.uint64(1000003)
+_MASK = np.uint64(2 ** 32 - 1)
+_BAND_MIX = _rng.randint(1, 2 ** 63, ROWS, dtype=np.uint64) | np.uint64(1)
+
+_TAG = re.compile(r"<[^>]+>")
+_WORD = re.compile(r"\w+")
+
+
+def job_words(job):
+    text = f"{job.get('title', '')} {job.get('company') or ''} {job.get('description', '')}"
+    return _WORD.findall(_TAG.sub(" ", text).lower())
+
+
+def content_hash(job):
+    # Stable across processes and sessions: same title, company and wording
+    # (ignoring case, markup and spacing) gives the same key
+    return hashlib.sha1(" ".join(job_words(job)).encode("utf-8")).hexdigest()
+
+
+def shingle_hashes(words, size=SHINGLE_SIZE):
+    # 32-bit hashes of the distinct word n-grams, combined from per-word
+    # hashes instead of joining strings
+    word_hashes = np.fromiter((zlib.crc32(w.encode("utf-8")) for w in words), dtype=np.uint64, count=len(words))
+    n = max(len(words) - size + 1, 1)
+    hashes = word_hashes[:n].copy()
+    for k in range(1, min(size, len(words))):
+        hashes = (hashes * _MIX + word_hashes[k:k + n]) & _MASK
+    return np.unique(hashes)
+
+
+def minhash(words):
+    hashes = shingle_hashes(words)
+    return ((_A[:, None] * hashes + _B[:, None]) >> _SHIFT).min(axis=1, initial=_EMPTY).astype(np.uint32)
+
+
+def similarity(sig_a, sig_b):
+    # Estimated Jaccard similarity of the two shingle sets
+    return float(np.mean(sig_a == sig_b))
+
+
+def _bands(signature):
+    # One 64-bit bucket key per band
+    rows = signature.reshape(BANDS, ROWS).astype(np.uint64)
+    return np.bitwise_xor.reduce(rows * _BAND_MIX, axis=1).tolist()
+
+
+class LSHIndex:
+    # Band buckets over signatures of the postings seen so far. With a window,
+    # only the latest `window` postings are kept (for unbounded streams).
+    def __init__(self, threshold=DUPLICATE_THRESHOLD, window=None):
+        self.threshold = threshold
+        self.window = window
+        self.signatures = OrderedDict()
+        self.buckets = [{} for _ in range(BANDS)]
+
+    def find(self, signature):
+        # Key of a stored near-duplicate, or None
+        checked = set()
+        for bucket, band in zip(self.buckets, _bands(signature)):
+            for key in bucket.get(band, ()):
+                if key not in checked:
+                    checked.add(key)
+                    if similarity(signature, self.signatures[key]) >= self.threshold:
+                        return key
+        return None
+
+    def add(self, key, signature):
+        self.signatures[key] = signature
+        # Buckets hold tuples: almost all have a single key
+        for bucket, band in zip(self.buckets, _bands(signature)):
+            bucket[band] = bucket.get(band, ()) + (key,)
+        if self.window and len(self.signatures) > self.window:
+            self._evict()
+
+    def _evict(self):
+        key, signature = self.signatures.popitem(last=False)
+        for bucket, band in zip(self.buckets, _bands(signature)):
+            keys = tuple(k for k in bucket[band] if k != key)
+            if keys:
+                bucket[band] = keys
+            else:
+                del bucket[band]
+
+
+@span("dedup.jobs")
+def dedupe_jobs(items, job=None, threshold=DUPLICATE_THRESHOLD):
+    # Keeps the first of each group of near-duplicates, in order. job gets the
+    # posting dict out of an item, e.g. for (job, score) pairs.
+    index = LSHIndex(threshold)
+    kept = []
+    for i, item in enumerate(items):
+        signature = minhash(job_words(job(item) if job else item))
+        if index.find(signature) is None:
+            index.add(i, signature)
+            kept.append(item)
+    return kept
@@ -0,0 +1,222 @@
+import numpy as np
+
+from array_store import (alive_mask, append_array, delete_ids, deleted_ids, load_cached, memmap, read_meta,
+                         recover_arrays, write_array, write_meta)
+from file_lock import locked
+from instrumentation import span
+from job_ann import ann_search, load_ann, rebuild_ann, sync_ann
+from job_index import search_index
+from matching import top_k_indices
+from nlp_utils import VECTOR_MODEL_NAME, get_vector_nlp, vectors_available
+
+# Optional semantic mode. Each job is embedded once as the average of its word
+# vectors and appended to a float32 matrix in an array_store directory next to
+# jobs.db. Rows are L2-normalized, so ranking is one matrix-vector product.
+EMBEDDINGS_DIR = "jobs_vectors"
+
+ARRAYS = {
+    "ids": np.int64,
+    # n_docs x dim, row-major
+    "vectors": np.float32,
+    # Tombstones for deleted jobs, skipped at search time until the next rebuild
+    "deleted": np.int64,
+}
+# Share of the semantic score in the hybrid score; the rest is TF-IDF
+SEMANTIC_WEIGHT = 0.5
+# Hybrid search re-scores this many candidates per requested result from each ranking
+CANDIDATE_FACTOR = 4
+
+_loaded = {"key": None, "value": None}
+
+
+def semantic_available():
+    return vectors_available()
+
+
+@span("nlp.embed")
+def embed_texts(texts):
+    # (len(texts), dim) float32, L2-normalized; texts without known words get
+    # a zero row and score 0 against everything
+    nlp = get_vector_nlp()
+    table = nlp.vocab.vectors
+    embeddings = np.zeros((len(texts), table.shape[1]), dtype=np.float32)
+    for i, doc in enumerate(nlp.tokenizer.pipe(text or "" for text in texts)):
+        keys = [token.lower for token in doc if token.is_alpha and not token.is_stop]
+        if not keys:
+            continue
+        rows = table.find(keys=keys)
+        rows = rows[rows >= 0]
+        if len(rows):
+            embeddings[i] = np.asarray(table.data[rows]).mean(axis=0)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return np.divide(embeddings, norms, out=embeddings, where=norms > 0)
+
+
+def build_embeddings(rows, store_dir=EMBEDDINGS_DIR):
+    # Full rebuild from (job_id, text) rows
+    rows = list(rows)
+    vectors = embed_texts([text for _, text in rows])
+    with locked(store_dir):
+        _write_store(rows, vectors, store_dir)
+
+
+def _write_store(rows, vectors, store_dir):
+    write_array(store_dir, "ids", [job_id for job_id, _ in rows], ARRAYS["ids"])
+    write_array(store_dir, "vectors", vectors, ARRAYS["vectors"])
+    write_array(store_dir, "deleted", [], ARRAYS["deleted"])
+    write_meta(store_dir, {"n_docs": len(rows), "dim": vectors.shape[1], "n_deleted": 0, "model": VECTOR_MODEL_NAME})
+
+
+def rebuild_embeddings(store_dir=EMBEDDINGS_DIR):
+    from job_database import get_all_jobs
+
+    build_embeddings(((job[0], job[2]) for job in get_all_jobs()), store_dir)
+    # Store rows were renumbered; retrain rather than append
+    rebuild_ann(store=load_embeddings(store_dir))
+
+
+def add_embeddings(rows, store_dir=EMBEDDINGS_DIR):
+    # Appends (job_id, text) rows. Does nothing when the vectors model is not
+    # installed, so jobs can always be added; rebuild_embeddings() catches up.
+    rows = list(rows)
+    if not rows or not semantic_available():
+        return
+    ids = np.array([job_id for job_id, _ in rows], dtype=np.int64)
+    vectors = embed_texts([text for _, text in rows])
+
+    with locked(store_dir):
+        meta = read_meta(store_dir)
+        if meta is None:
+            _write_store([], vectors[:0], store_dir)
+            meta = read_meta(store_dir)
+        else:
+            _recover(store_dir, meta)
+        append_array(store_dir, "ids", ids, ARRAYS["ids"])
+        append_array(store_dir, "vectors", vectors, ARRAYS["vectors"])
+        meta["n_docs"] += len(rows)
+        write_meta(store_dir, meta)
+
+        # The ANN index follows the store; it is built in the background once
+        # the store is big enough
+        sync_ann(load_embeddings(store_dir))
+
+
+def _recover(store_dir, meta):
+    # Back to the lengths meta.json committed, so appends stay row-aligned
+    recover_arrays(store_dir, meta, ARRAYS, {"ids": meta["n_docs"], "vectors": meta["n_docs"] * meta["dim"]})
+
+
+def delete_embeddings(job_ids, store_dir=EMBEDDINGS_DIR):
+    # Tombstones the jobs; rebuild_embeddings() drops them for good
+    delete_ids(store_dir, job_ids, _recover)
+
+
+def load_embeddings(store_dir=EMBEDDINGS_DIR):
+    return load_cached(store_dir, _loaded, lambda meta: _load_embeddings(store_dir, meta))
+
+
+def _load_embeddings(store_dir, meta):
+    n_docs, dim = meta["n_docs"], meta["dim"]
+    ids = memmap(store_dir, "ids", ARRAYS["ids"], n_docs)
+    alive = alive_mask(ids, deleted_ids(store_dir, meta))
+    vectors = memmap(store_dir, "vectors", ARRAYS["vectors"], n_docs, dim)
+    # Job ids are appended in increasing order, so store_rows() can binary
+    # search ids as they are; only a store written out of order is sorted
+    order = None if np.all(ids[1:] > ids[:-1]) else np.argsort(ids, kind="stable")
+    return {"n_docs": n_docs, "dim": dim, "ids": ids, "vectors": vectors, "alive": alive, "order": order,
+            "sorted_ids": ids if order is None else ids[order]}
+
+
+def store_rows(store, job_ids):
+    # Store row of each job id, -1 for jobs not stored or deleted. A job
+    # stored twice maps to its latest row.
+    job_ids = np.asarray(job_ids, dtype=np.int64)
+    sorted_ids = store["sorted_ids"]
+    if not len(sorted_ids):
+        return np.full(len(job_ids), -1, dtype=np.int64)
+    pos = np.searchsorted(sorted_ids, job_ids, side="right") - 1
+    found = (pos >= 0) & (sorted_ids[np.maximum(pos, 0)] == job_ids)
+    rows = np.maximum(pos, 0) if store["order"] is None else store["order"][np.maximum(pos, 0)]
+    if store["alive"] is not None:
+        found &= store["alive"][rows]
+    return np.where(found, rows, -1)
+
+
+def max_embedded_id(store_dir=EMBEDDINGS_DIR):
+    # Highest job id in the store, 0 when it is empty or missing
+    store = load_embeddings(store_dir)
+    return int(store["ids"].max()) if store is not None and store["n_docs"] else 0
+
+
+def job_vectors(jobs, store_dir=EMBEDDINGS_DIR):
+    # Embeddings for job dicts: stored rows for jobs with a known "id", the
+    # rest embedded on the fly
+    store = load_embeddings(store_dir)
+    job_ids = [job.get("id") if isinstance(job.get("id"), int) else -1 for job in jobs]
+    rows = store_rows(store, job_ids) if store else np.full(len(jobs), -1)
+    missing = np.flatnonzero(rows < 0)
+    dim = store["dim"] if store else None
+    fresh = embed_texts([jobs[i].get("description", "") for i in missing]) if len(missing) else None
+    if dim is None:
+        dim = fresh.shape[1]
+    vectors = np.zeros((len(jobs), dim), dtype=np.float32)
+    stored = np.flatnonzero(rows >= 0)
+    if len(stored):
+        vectors[stored] = store["vectors"][rows[stored]]
+    if len(missing):
+        vectors[missing] = fresh
+    return vectors
+
+
+def semantic_scores(resume_text, vectors):
+    # Cosine of the resume against every row, one matrix-vector product
+    query = embed_texts([resume_text])[0]
+    return np.asarray(vectors @ query, dtype=np.float32)
+
+
+def hybrid_scores(tfidf_scores, semantic, semantic_weight=SEMANTIC_WEIGHT):
+    return (1 - semantic_weight) * np.asarray(tfidf_scores, dtype=np.float32) + semantic_weight * semantic
+
+
+def search_embeddings(resume_text, top_n=10, store_dir=EMBEDDINGS_DIR, allowed_ids=None, approximate=True):
+    # Semantic-only search over the stored jobs: [(job_id, score), ...] best
+    # first, every job for top_n=None. Unfiltered top-n searches go through
+    # the ANN index when one is built.
+    store = load_embeddings(store_dir)
+    if store is None or not store["n_docs"]:
+        return []
+    ann = load_ann() if approximate and allowed_ids is None and top_n is not None else None
+    if top_n is None:
+        top_n = store["n_docs"]
+    if not top_n:
+        return []
+    if ann is not None:
+        return ann_search(ann, embed_texts([resume_text])[0], top_n, store=store)
+    scores = semantic_scores(resume_text, store["vectors"])
+    if store["alive"] is not None:
+        scores[~store["alive"]] = -np.inf
+    if allowed_ids is not None:
+        scores[~np.isin(store["ids"], np.fromiter(allowed_ids, dtype=np.int64))] = -np.inf
+    return [(int(store["ids"][i]), float(scores[i])) for i in top_k_indices(scores, top_n)
+            if np.isfinite(scores[i])]
+
+
+def hybrid_search(resume_text, top_n=10, allowed_ids=None, semantic_weight=SEMANTIC_WEIGHT,
+                  store_dir=EMBEDDINGS_DIR):
+    # Candidates from both rankings, re-scored exactly with both and blended
+    pool = None if top_n is None else top_n * CANDIDATE_FACTOR
+    candidates = {job_id for job_id, _ in search_index(resume_text, pool, allowed_ids=allowed_ids)}
+    candidates.update(job_id for job_id, _ in search_embeddings(resume_text, pool, store_dir, allowed_ids))
+    if not candidates:
+        return []
+
+    tfidf = dict(search_index(resume_text, len(candidates), allowed_ids=candidates, exhaustive=True))
+    store = load_embeddings(store_dir)
+    ids = sorted(candidates)
+    rows = store_rows(store, ids) if store else np.full(len(ids), -1)
+    semantic = np.zeros(len(ids), dtype=np.float32)
+    known = np.flatnonzero(rows >= 0)
+    if len(known):
+        semantic[known] = semantic_scores(resume_text, store["vectors"][rows[known]])
+    scores = hybrid_scores([tfidf.get(job_id, 0.0) for job_id in ids], semantic, semantic_weight)
+    return [(ids[i], float(scores[i])) for i in top_k_indices(scores, top_n)]
@@ -0,0 +1,247 @@
+import asyncio
+import atexit
+import queue
+import threading
+from datetime import datetime, timezone
+
+from dateutil import parser
+
+from instrumentation import span
+
+# Adzuna credentials
+ADZUNA_APP_ID = "b841a9e9"
+ADZUNA_APP_KEY = "a2cb932c2d2c2f9c142f75ee5a9bb7b0"
+
+COUNTRY_CODE = "in"
+ADZUNA_URL = "https://api.adzuna.com/v1/api/jobs/{country}/search/{page}"
+REMOTIVE_URL = "https://remotive.io/api/remote-jobs"
+
+ADZUNA_PAGES = 3
+ADZUNA_RESULTS_PER_PAGE = 50
+REMOTIVE_MAX_AGE_DAYS = 14
+
+# Seconds per request, per source
+SOURCE_TIMEOUTS = {"Adzuna": 10, "Remotive": 15}
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 0.5
+MAX_CONCURRENCY = 4
+
+# One event loop thread owns a long-lived aiohttp session, so connections are
+# pooled and reused across Streamlit reruns instead of per request.
+_runner = {"loop": None, "session": None}
+_runner_lock = threading.Lock()
+
+
+def _get_loop():
+    with _runner_lock:
+        if _runner["loop"] is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="job-feeds", daemon=True).start()
+            _runner["loop"] = loop
+        return _runner["loop"]
+
+
+async def _get_session():
+    # Only ever called on the runner loop; aiohttp is imported on first fetch
+    import aiohttp
+
+    if _runner["session"] is None or _runner["session"].closed:
+        connector = aiohttp.TCPConnector(limit=MAX_CONCURRENCY, ttl_dns_cache=300)
+        _runner["session"] = aiohttp.ClientSession(connector=connector)
+    return _runner["session"]
+
+
+@atexit.register
+def close_session():
+    loop, session = _runner["loop"], _runner["session"]
+    if loop is not None and session is not None and not session.closed:
+        asyncio.run_coroutine_threadsafe(session.close(), loop).result(timeout=5)
+
+
+async def _get(session, semaphore, source, url, params=None, headers=None):
+    # Returns (status, json, response headers); status is None when every
+    # attempt failed
+    import aiohttp
+
+    timeout = aiohttp.ClientTimeout(total=SOURCE_TIMEOUTS[source])
+    for attempt in range(MAX_RETRIES):
+        try:
+            async with semaphore:
+                async with session.get(url, params=params, headers=headers, timeout=timeout) as response:
+                    if response.status == 200:
+                        return 200, await response.json(content_type=None), response.headers
+                    if response.status == 304 or (response.status < 500 and response.status != 429):
+                        # Not modified, or a client error that a retry will not fix
+                        return response.status, None, response.headers
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            pass
+        if attempt < MAX_RETRIES - 1:
+            await asyncio.sleep(BACKOFF_SECONDS * 2 ** attempt)
+    return None, None, {}
+
+
+async def _get_json(session, semaphore, source, url, params=None):
+    status, data, _ = await _get(session, semaphore, source, url, params)
+    return data if status == 200 else None
+
+
+def normalize_adzuna_job(job):
+    return {
+        "title": job.get("title", "No Title"),
+        "description": job.get("description", ""),
+        "redirect_url": job.get("redirect_url", ""),
+        "source": "Adzuna",
+        "created": job.get("created", ""),
+        "location": job.get("location", {}).get("display_name", "")
+    }
+
+
+def normalize_remotive_job(job):
+    return {
+        "title": job.get("title", "No Title"),
+        "description": job.get("description", ""),
+        "redirect_url": job.get("url", ""),
+        "source": "Remotive",
+        "created": job.get("publication_date", ""),
+        "location": job.get("candidate_required_location", "")
+    }
+
+
+def parse_posted_at(date_str):
+    # Publication date as a UTC epoch, or None when missing or unparseable
+    if not date_str:
+        return None
+    try:
+        pub_date = parser.parse(date_str)
+    except (ValueError, OverflowError):
+        return None
+    if pub_date.tzinfo is None:
+        pub_date = pub_date.replace(tzinfo=timezone.utc)
+    return int(pub_date.timestamp())
+
+
+def is_recent(date_str, now, max_age_days=REMOTIVE_MAX_AGE_DAYS):
+    posted_at = parse_posted_at(date_str)
+    return posted_at is not None and now.timestamp() - posted_at < (max_age_days + 1) * 86400
+
+
+def feed_request(source, keyword="", page=1):
+    if source == "Adzuna":
+        params = {
+            "app_id": ADZUNA_APP_ID,
+            "app_key": ADZUNA_APP_KEY,
+            "results_per_page": ADZUNA_RESULTS_PER_PAGE,
+            "what": keyword,
+            "content-type": "application/json"
+        }
+        return ADZUNA_URL.format(country=COUNTRY_CODE, page=page), params
+    return REMOTIVE_URL, None
+
+
+def parse_feed(source, data):
+    if not data:
+        return []
+    if source == "Adzuna":
+        return [normalize_adzuna_job(job) for job in data.get("results", [])]
+    return [normalize_remotive_job(job) for job in data.get("jobs", [])]
+
+
+async def _fetch_adzuna_page(session, semaphore, keyword, page):
+    url, params = feed_request("Adzuna", keyword, page)
+    return parse_feed("Adzuna", await _get_json(session, semaphore, "Adzuna", url, params))
+
+
+async def _fetch_remotive(session, semaphore):
+    url, params = feed_request("Remotive")
+    jobs = parse_feed("Remotive", await _get_json(session, semaphore, "Remotive", url, params))
+    now = datetime.now(timezone.utc)
+    return [job for job in jobs if is_recent(job["created"], now)]
+
+
+async def _fetch_feed(session, semaphore, feed):
+    # Conditional GET with the validators from the last successful fetch
+    url, params = feed_request(feed["source"], feed.get("keyword", ""), feed.get("page", 1))
+    headers = {}
+    if feed.get("etag"):
+        headers["If-None-Match"] = feed["etag"]
+    if feed.get("last_modified"):
+        headers["If-Modified-Since"] = feed["last_modified"]
+    status, data, response_headers = await _get(session, semaphore, feed["source"], url, params, headers)
+    return {
+        "feed": feed["feed"],
+        "source": feed["source"],
+        "status": status,
+        "jobs": parse_feed(feed["source"], data) if status == 200 else [],
+        "etag": response_headers.get("ETag"),
+        "last_modified": response_headers.get("Last-Modified"),
+    }
+
+
+async def _labelled(source, coro):
+    return source, await coro
+
+
+def _source_tasks(session, semaphore, keyword, sources, adzuna_pages):
+    tasks = []
+    if "Adzuna" in sources:
+        tasks += [
+            _labelled("Adzuna", _fetch_adzuna_page(session, semaphore, keyword, page))
+            for page in range(1, adzuna_pages + 1)
+        ]
+    if "Remotive" in sources:
+        tasks.append(_labelled("Remotive", _fetch_remotive(session, semaphore)))
+    return tasks
+
+
+def _iter_completed(make_coros):
+    # Runs the coroutines on the shared loop and yields each result as soon as
+    # it is ready, fastest first
+    results = queue.Queue()
+
+    async def produce():
+        try:
+            session = await _get_session()
+            semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+            for done in asyncio.as_completed(make_coros(session, semaphore)):
+                results.put(await done)
+        finally:
+            results.put(None)
+
+    future = asyncio.run_coroutine_threadsafe(produce(), _get_loop())
+    while True:
+        item = results.get()
+        if item is None:
+            break
+        yield item
+    future.result()
+
+
+def iter_jobs(keyword, sources=("Adzuna", "Remotive"), adzuna_pages=ADZUNA_PAGES):
+    # Yields (source, jobs) as each request finishes.
+    # Every Adzuna page is its own item.
+    return _iter_completed(
+        lambda session, semaphore: _source_tasks(session, semaphore, keyword, sources, adzuna_pages)
+    )
+
+
+def iter_feeds(feeds):
+    # feeds: dicts with feed, source, keyword, page and the etag/last_modified
+    # validators. Yields one result dict per feed as it completes.
+    return _iter_completed(
+        lambda session, semaphore: [_fetch_feed(session, semaphore, feed) for feed in feeds]
+    )
+
+
+@span("feeds.all")
+def fetch_all_jobs(keyword, adzuna_pages=ADZUNA_PAGES):
+    return [job for _, jobs in iter_jobs(keyword, adzuna_pages=adzuna_pages) for job in jobs]
+
+
+@span("feeds.adzuna")
+def fetch_adzuna_jobs(keyword, pages=ADZUNA_PAGES):
+    return [job for _, jobs in iter_jobs(keyword, ("Adzuna",), pages) for job in jobs]
+
+
+@span("feeds.remotive")
+def fetch_remotive_jobs():
+    return [job for _, jobs in iter_jobs("", ("Remotive",)) for job in jobs]
@@ -0,0 +1,510 @@
+import os
+from collections import Counter
+
+import numpy as np
+
+from array_store import (alive_mask, append_array, array_length, delete_ids, deleted_ids, load_cached,
+                         memmap, path, read_meta, recover_arrays, truncate, write_array, write_meta)
+from file_lock import locked
+from instrumentation import span
+from matching import top_k_indices
+
+# Index lives next to jobs.db, an array_store directory: adding a job appends
+# to the row arrays and never rewrites what is already on disk. meta.json
+# commits n_docs, nnz, n_terms, posted_docs, posted_terms, posted_nnz,
+# n_deleted, and n_lemmas and lemmas_size for lemmas.txt.
+INDEX_DIR = "jobs_index"
+
+VOCAB_FILE = "vocab.txt"
+# spaCy lemma of the first n_lemmas vocabulary terms, line for line, written
+# by update_lemmas() when the model is installed; keyword ranking looks lemmas
+# up against it (term_idf)
+LEMMAS_FILE = "lemmas.txt"
+DF_FILE = "df.npy"
+ARRAYS = {
+    "ids": np.int64,
+    "indptr": np.int32,
+    "indices": np.int32,
+    "data": np.float32,
+    # Inverted index: term -> posting list of (row, weight), rows ascending
+    "post_ptr": np.int64,
+    "post_rows": np.int32,
+    "post_weights": np.float32,
+    "max_weights": np.float32,
+    # Tombstones for deleted jobs, skipped at search time until the next rebuild
+    "deleted": np.int64,
+}
+# Rows appended after the last postings build are scored by brute force;
+# once that tail grows past this fraction of the index the postings are rebuilt
+TAIL_COMPACT_RATIO = 0.1
+# Pruned search gives up once its candidates pass this share of the rows;
+# gathering that many rows costs about as much as scoring all of them
+PRUNE_MAX_RATIO = 0.125
+
+_loaded = {"key": None, "value": None}
+_analyzer = {"analyze": None}
+
+
+def analyze(text):
+    # TfidfVectorizer's tokenizer, built on first use
+    if _analyzer["analyze"] is None:
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        _analyzer["analyze"] = TfidfVectorizer().build_analyzer()
+    return _analyzer["analyze"](text)
+
+
+def _idf(df, n_docs):
+    # Same smoothed idf as sklearn's TfidfVectorizer
+    return np.log((1 + n_docs) / (1 + df)) + 1
+
+
+def _read_vocab(index_dir):
+    with open(path(index_dir, VOCAB_FILE), encoding="utf-8") as f:
+        return {term: i for i, term in enumerate(f.read().splitlines())}
+
+
+def _write_vocab(terms, index_dir):
+    tmp = path(index_dir, VOCAB_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.writelines(f"{term}\n" for term in terms)
+    os.replace(tmp, path(index_dir, VOCAB_FILE))
+
+
+def update_lemmas(index_dir=INDEX_DIR):
+    # Lemmatizes the vocabulary terms lemmas.txt does not cover yet. spaCy
+    # runs outside the lock, and only from builds and CLIs (ingest.py,
+    # setup_models.py), never from add_to_index(). The first run after the
+    # model is installed covers the whole vocabulary. Returns the number of
+    # terms lemmatized.
+    from nlp_utils import MODEL_NAME, lemmatize_terms, model_installed
+
+    meta = read_meta(index_dir)
+    if meta is None or not model_installed(MODEL_NAME):
+        return 0
+    start = meta.get("n_lemmas", 0)
+    terms = list(_read_vocab(index_dir))[start:meta.get("n_terms")]
+    if not terms:
+        return 0
+    lemmas = lemmatize_terms(terms)
+
+    with locked(index_dir):
+        meta = read_meta(index_dir)
+        _recover(index_dir, meta)
+        # Skipped when the index was rebuilt or lemmatized meanwhile
+        if meta.get("n_lemmas", 0) != start or list(_read_vocab(index_dir))[start:start + len(terms)] != terms:
+            return 0
+        lemmas_path = path(index_dir, LEMMAS_FILE)
+        with open(lemmas_path, "a", encoding="utf-8") as f:
+            f.writelines(f"{lemma}\n" for lemma in lemmas)
+        meta.update(n_lemmas=start + len(lemmas), lemmas_size=os.path.getsize(lemmas_path))
+        write_meta(index_dir, meta)
+    return len(lemmas)
+
+
+def _write_df(df, index_dir):
+    tmp = path(index_dir, DF_FILE + ".tmp.npy")
+    np.save(tmp, df)
+    os.replace(tmp, path(index_dir, DF_FILE))
+
+
+def _memmap(name, index_dir, length):
+    return memmap(index_dir, name, ARRAYS[name], length)
+
+
+def _matrix(index_dir, n_docs, nnz, n_terms):
+    from scipy.sparse import csr_matrix
+
+    return csr_matrix(
+        (
+            _memmap("data", index_dir, nnz),
+            _memmap("indices", index_dir, nnz),
+            _memmap("indptr", index_dir, n_docs + 1),
+        ),
+        shape=(n_docs, n_terms),
+        copy=False,
+    )
+
+
+def _write_arrays(arrays, index_dir):
+    for name, values in arrays.items():
+        write_array(index_dir, name, values, ARRAYS[name])
+
+
+def _write_postings(matrix, index_dir):
+    # Returns (posted_terms, posted_nnz) for the meta
+    csc = matrix.tocsc()
+    csc.sort_indices()
+    max_weights = np.zeros(csc.shape[1], dtype=np.float32)
+    lengths = np.diff(csc.indptr)
+    if csc.nnz:
+        max_weights[lengths > 0] = np.maximum.reduceat(csc.data, csc.indptr[:-1][lengths > 0])
+    _write_arrays(
+        {
+            "post_ptr": csc.indptr,
+            "post_rows": csc.indices,
+            "post_weights": csc.data,
+            "max_weights": max_weights,
+        },
+        index_dir,
+    )
+    return csc.shape[1], int(csc.nnz)
+
+
+def build_index(rows, index_dir=INDEX_DIR):
+    # Full rebuild from (job_id, text) rows
+    with locked(index_dir):
+        _build_index(rows, index_dir)
+    update_lemmas(index_dir)
+
+
+def _build_index(rows, index_dir):
+    from scipy.sparse import csr_matrix
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    rows = list(rows)
+    os.makedirs(index_dir, exist_ok=True)
+
+    ids = np.array([job_id for job_id, _ in rows], dtype=np.int64)
+    try:
+        vectorizer = TfidfVectorizer(dtype=np.float32)
+        matrix = vectorizer.fit_transform([text or "" for _, text in rows]).tocsr()
+        matrix.sort_indices()
+        terms = vectorizer.get_feature_names_out()
+    except ValueError:
+        matrix = csr_matrix((len(rows), 0), dtype=np.float32)
+        terms = []
+
+    df = np.bincount(matrix.indices, minlength=len(terms)).astype(np.int64)
+
+    _write_vocab(terms, index_dir)
+    truncate(path(index_dir, LEMMAS_FILE), 0)
+    _write_df(df, index_dir)
+    _write_arrays(
+        {
+            "ids": ids,
+            "indptr": matrix.indptr,
+            "indices": matrix.indices,
+            "data": matrix.data,
+            "deleted": [],
+        },
+        index_dir,
+    )
+    posted_terms, posted_nnz = _write_postings(matrix, index_dir)
+    write_meta(index_dir, {"n_docs": len(rows), "nnz": int(matrix.nnz), "n_terms": len(terms),
+                           "posted_docs": len(rows), "posted_terms": posted_terms, "posted_nnz": posted_nnz,
+                           "n_deleted": 0, "n_lemmas": 0, "lemmas_size": 0})
+
+
+def compact_postings(index_dir=INDEX_DIR):
+    # Fold rows appended since the last build into the posting lists
+    with locked(index_dir):
+        meta = read_meta(index_dir)
+        if meta is not None:
+            _recover(index_dir, meta)
+            _compact_postings(index_dir)
+
+
+def _compact_postings(index_dir):
+    # Reads the committed matrix directly, the postings may be the broken part
+    meta = read_meta(index_dir)
+    n_docs, nnz = meta["n_docs"], meta["nnz"]
+    n_terms = meta.get("n_terms", len(np.load(path(index_dir, DF_FILE))))
+    posted_terms, posted_nnz = _write_postings(_matrix(index_dir, n_docs, nnz, n_terms), index_dir)
+    meta.update(n_terms=n_terms, posted_docs=n_docs, posted_terms=posted_terms, posted_nnz=posted_nnz)
+    write_meta(index_dir, meta)
+
+
+def _array_length(name, index_dir):
+    return array_length(index_dir, name, ARRAYS[name])
+
+
+def _recover(index_dir, meta):
+    # Brings the files back to what meta.json committed. An append that died
+    # part-way leaves bytes past the committed lengths (later appends would
+    # land after them), extra vocabulary lines, and a df that may already
+    # count the lost rows; a compaction that died leaves mismatched postings.
+    n_docs, nnz = meta["n_docs"], meta["nnz"]
+    cut = recover_arrays(index_dir, meta, ARRAYS, {"ids": n_docs, "indptr": n_docs + 1, "indices": nnz, "data": nnz})
+    df = np.load(path(index_dir, DF_FILE))
+    n_terms = meta.get("n_terms", len(df))
+    with open(path(index_dir, VOCAB_FILE), encoding="utf-8") as f:
+        terms = f.read().splitlines()
+    if len(terms) > n_terms:
+        _write_vocab(terms[:n_terms], index_dir)
+        cut = True
+    # An index from before n_lemmas was recorded is lemmatized again
+    truncate(path(index_dir, LEMMAS_FILE), meta.get("lemmas_size", 0))
+    if cut or len(df) != n_terms:
+        df = np.bincount(_memmap("indices", index_dir, nnz), minlength=n_terms).astype(np.int64)
+        _write_df(df, index_dir)
+
+    posted_terms = meta["posted_terms"]
+    if (_array_length("post_ptr", index_dir) != posted_terms + 1
+            or _array_length("max_weights", index_dir) != posted_terms
+            or "posted_nnz" in meta and _array_length("post_rows", index_dir) != meta["posted_nnz"]
+            or _array_length("post_weights", index_dir) != _array_length("post_rows", index_dir)):
+        _compact_postings(index_dir)
+
+
+def rebuild_index(index_dir=INDEX_DIR):
+    from job_database import get_all_jobs
+
+    build_index(((job[0], job[2]) for job in get_all_jobs()), index_dir)
+
+
+def add_to_index(rows, index_dir=INDEX_DIR):
+    # Incremental append of (job_id, text) rows. New rows are weighted with the
+    # idf at insert time; call rebuild_index() now and then to re-weight
+    # everything against the current document frequencies.
+    with locked(index_dir):
+        _add_to_index(rows, index_dir)
+
+
+def _add_to_index(rows, index_dir):
+    from scipy.sparse import csr_matrix
+    from sklearn.feature_extraction.text import CountVectorizer
+    from sklearn.preprocessing import normalize
+
+    rows = list(rows)
+    meta = read_meta(index_dir)
+    if meta is None:
+        _build_index([], index_dir)
+    else:
+        _recover(index_dir, meta)
+    meta = read_meta(index_dir)
+    if not rows:
+        return
+
+    vocab = _read_vocab(index_dir)
+    df = np.load(path(index_dir, DF_FILE))
+    n_docs, nnz = meta["n_docs"], meta["nnz"]
+
+    # Count the batch with its own vocabulary, then remap columns to index ids
+    try:
+        counter = CountVectorizer(dtype=np.float32)
+        counts = counter.fit_transform([text or "" for _, text in rows]).tocsr()
+        batch_terms = counter.get_feature_names_out()
+    except ValueError:
+        counts = csr_matrix((len(rows), 0), dtype=np.float32)
+        batch_terms = []
+    new_terms = []
+    mapping = np.empty(len(batch_terms), dtype=np.int32)
+    for j, term in enumerate(batch_terms):
+        term_id = vocab.get(term)
+        if term_id is None:
+            term_id = vocab[term] = len(vocab)
+            new_terms.append(term)
+        mapping[j] = term_id
+    counts = csr_matrix((counts.data, mapping[counts.indices], counts.indptr), shape=(len(rows), len(vocab)))
+    counts.sort_indices()
+
+    df = np.concatenate([df, np.zeros(len(new_terms), dtype=np.int64)])
+    df += np.bincount(counts.indices, minlength=len(vocab))
+    n_docs_after = n_docs + len(rows)
+    weights = counts.multiply(_idf(df, n_docs_after)).tocsr().astype(np.float32)
+    if len(vocab):
+        # sklearn rejects a matrix without columns (no terms indexed yet)
+        weights = normalize(weights)
+
+    # Appends first, then df, then meta.json as the commit point; _recover()
+    # cuts anything an interrupted update left past the committed lengths
+    if new_terms:
+        with open(path(index_dir, VOCAB_FILE), "a", encoding="utf-8") as f:
+            f.writelines(f"{term}\n" for term in new_terms)
+    arrays = {
+        "ids": [job_id for job_id, _ in rows],
+        "indptr": weights.indptr[1:] + nnz,
+        "indices": weights.indices,
+        "data": weights.data,
+    }
+    for name, values in arrays.items():
+        append_array(index_dir, name, values, ARRAYS[name])
+    nnz += weights.nnz
+    _write_df(df, index_dir)
+    meta.update(n_docs=n_docs_after, nnz=nnz, n_terms=len(vocab),
+                posted_nnz=meta.get("posted_nnz", _array_length("post_rows", index_dir)))
+    write_meta(index_dir, meta)
+
+    if n_docs_after - meta["posted_docs"] > TAIL_COMPACT_RATIO * max(meta["posted_docs"], 100):
+        _compact_postings(index_dir)
+
+
+def delete_from_index(job_ids, index_dir=INDEX_DIR):
+    # Tombstones the jobs: searches skip them before the top-k cut, and the
+    # next rebuild_index() drops them (df keeps counting them until then)
+    delete_ids(index_dir, job_ids, _recover)
+
+
+def load_index(index_dir=INDEX_DIR):
+    return load_cached(index_dir, _loaded, lambda meta: _load_index(index_dir, meta))
+
+
+def _load_index(index_dir, meta):
+    vocab = _read_vocab(index_dir)
+    df = np.load(path(index_dir, DF_FILE))
+    n_docs, nnz = meta["n_docs"], meta["nnz"]
+    matrix = _matrix(index_dir, n_docs, nnz, len(vocab))
+    posted_docs, posted_terms = meta["posted_docs"], meta["posted_terms"]
+    post_ptr = _memmap("post_ptr", index_dir, posted_terms + 1)
+    posted_nnz = int(post_ptr[-1])
+    ids = _memmap("ids", index_dir, n_docs)
+    index = {
+        "vocab": vocab,
+        "df": df,
+        "idf": _idf(df, n_docs).astype(np.float32),
+        "n_docs": n_docs,
+        "n_lemmas": meta.get("n_lemmas", 0),
+        "ids": ids,
+        "alive": alive_mask(ids, deleted_ids(index_dir, meta)),
+        "matrix": matrix,
+        "posted_docs": posted_docs,
+        "post_ptr": post_ptr,
+        "post_rows": _memmap("post_rows", index_dir, posted_nnz),
+        "post_weights": _memmap("post_weights", index_dir, posted_nnz),
+        "max_weights": _memmap("max_weights", index_dir, posted_terms),
+    }
+    return index
+
+
+def max_indexed_id(index_dir=INDEX_DIR):
+    # Highest job id in the index, 0 when it is empty or missing
+    index = load_index(index_dir)
+    return int(index["ids"].max()) if index is not None and index["n_docs"] else 0
+
+
+def _lemma_idf(index, index_dir):
+    # lemma -> idf, with the df of the vocabulary terms sharing a lemma added
+    # up (capped at n_docs). Terms added since the last update_lemmas() count
+    # as their own lemma. None when nothing is lemmatized.
+    if "lemma_idf" not in index:
+        index["lemma_idf"] = None
+        n_lemmas = index["n_lemmas"]
+        if n_lemmas:
+            with open(path(index_dir, LEMMAS_FILE), encoding="utf-8") as f:
+                lemmas = f.read().splitlines()[:n_lemmas] + list(index["vocab"])[n_lemmas:]
+            ids = {}
+            columns = np.array([ids.setdefault(lemma, len(ids)) for lemma in lemmas], dtype=np.int64)
+            df = np.bincount(columns, weights=index["df"], minlength=len(ids))
+            idf = _idf(np.minimum(df, index["n_docs"]), index["n_docs"])
+            index["lemma_idf"] = dict(zip(ids, idf.tolist()))
+    return index["lemma_idf"]
+
+
+def term_idf(terms, index_dir=INDEX_DIR):
+    # Corpus idf of each lemma (nlp_utils.analyze_text terms); terms no stored
+    # job contains get the highest idf. None when there is no index yet.
+    # Until update_lemmas() has run (spaCy model missing) terms are looked up
+    # as words.
+    index = load_index(index_dir)
+    if index is None:
+        return None
+    unseen = float(_idf(0, index["n_docs"]))
+    lemma_idf = _lemma_idf(index, index_dir)
+    if lemma_idf is not None:
+        return {term: lemma_idf.get(term, unseen) for term in terms}
+    vocab, idf = index["vocab"], index["idf"]
+    return {term: float(idf[vocab[term]]) if term in vocab else unseen for term in terms}
+
+
+def query_vector(index, text):
+    # L2-normalized tf-idf weights of the query over the index vocabulary
+    counts = Counter(analyze(text or ""))
+    terms = np.array([index["vocab"][t] for t in counts if t in index["vocab"]], dtype=np.int32)
+    if not len(terms):
+        return terms, np.zeros(0, dtype=np.float32)
+    weights = np.array([counts[t] for t in counts if t in index["vocab"]], dtype=np.float32)
+    order = np.argsort(terms)
+    terms, weights = terms[order], weights[order] * index["idf"][terms[order]]
+    return terms, weights / np.linalg.norm(weights)
+
+
+def candidate_rows(index, terms, weights, top_k, allowed=None, limit=None):
+    # MaxScore retrieval. Posting lists are walked by descending upper bound
+    # (query weight * max posting weight). theta is a lower bound on the k-th
+    # best score; once the bounds of the unvisited lists add up to no more than
+    # theta, no unseen row can reach the top-k and the long, low-weight lists
+    # of common terms are never touched. Survivors are re-scored exactly.
+    # Returns None as soon as more than limit rows are touched: pruning is not
+    # paying off and scoring every row is cheaper.
+    n_terms = len(index["max_weights"])
+    posted = terms < n_terms
+    terms, weights = terms[posted], weights[posted]
+    bounds = weights * index["max_weights"][terms]
+    order = np.argsort(-bounds, kind="stable")
+    remaining = float(bounds.sum())
+
+    acc = np.zeros(index["posted_docs"], dtype=np.float32)
+    theta = 0.0
+    touched = 0
+    for i in order:
+        if not bounds[i] or remaining <= theta:
+            break
+        # Clamped, rounding must not push rows that tie theta below it
+        remaining = max(remaining - float(bounds[i]), 0.0)
+        start, end = index["post_ptr"][terms[i]], index["post_ptr"][terms[i] + 1]
+        rows = index["post_rows"][start:end]
+        list_weights = index["post_weights"][start:end]
+        if allowed is not None:
+            keep = allowed[rows]
+            rows, list_weights = rows[keep], list_weights[keep]
+        if limit is not None:
+            # Posting weights are positive, so rows still at 0 are new
+            touched += len(rows) if not touched else int(np.count_nonzero(acc[rows] == 0))
+            if touched > limit:
+                return None
+        acc[rows] += list_weights * weights[i]
+        if len(rows) >= top_k:
+            # k-th best among rows just raised is a valid lower bound
+            kth = np.partition(acc[rows], len(rows) - top_k)[len(rows) - top_k]
+            theta = max(theta, float(kth))
+
+    rows = np.flatnonzero(acc)
+    return rows[acc[rows] + remaining >= theta]
+
+
+@span("search.index")
+def search_index(resume_text, top_n=10, index_dir=INDEX_DIR, allowed_ids=None, exhaustive=False):
+    # Returns [(job_id, score), ...] best first, jobs sharing no term with the
+    # resume left out; top_n=None ranks every matching job. allowed_ids
+    # restricts the search to those job ids; exhaustive=True skips pruning and
+    # scores every row.
+    index = load_index(index_dir)
+    if index is None or not index["n_docs"]:
+        return []
+    if top_n is None:
+        top_n = index["n_docs"]
+    if not top_n:
+        return []
+    terms, weights = query_vector(index, resume_text)
+    if not len(terms):
+        return []
+
+    allowed = index["alive"]
+    if allowed_ids is not None:
+        requested = np.isin(index["ids"], np.fromiter(allowed_ids, dtype=np.int64))
+        allowed = requested if allowed is None else allowed & requested
+
+    query = np.zeros(len(index["vocab"]), dtype=np.float32)
+    query[terms] = weights
+    if not exhaustive:
+        # Rows appended since the last postings build are always scored
+        tail = np.arange(index["posted_docs"], index["n_docs"])
+        if allowed is not None:
+            tail = tail[allowed[tail]]
+        limit = int(index["n_docs"] * PRUNE_MAX_RATIO) - len(tail)
+        candidates = candidate_rows(index, terms, weights, top_n, allowed, limit)
+        exhaustive = candidates is None
+    if exhaustive:
+        # One mat-vec over the whole matrix, no row gather
+        rows = np.arange(index["n_docs"])
+        scores = index["matrix"] @ query
+        if allowed is not None:
+            rows, scores = rows[allowed], scores[allowed]
+    else:
+        # Exact cosine only on the surviving rows
+        rows = np.concatenate([candidates, tail])
+        scores = index["matrix"][rows] @ query
+    matched = np.flatnonzero(scores > 0)
+    rows, scores = rows[matched], scores[matched]
+    return [(int(index["ids"][rows[i]]), float(scores[i])) for i in top_k_indices(scores, top_n)]
@@ -0,0 +1,81 @@
+import heapq
+from collections import Counter, OrderedDict
+
+from instrumentation import span
+from job_index import term_idf
+from nlp_utils import analyze_text, text_key
+
+# Keyword engine shared by the analyzer (missing keywords against a job
+# description) and the job matcher (keywords of a resume). Terms are lemmas;
+# analyze maps a text to them and the app passes its cached version. Terms
+# are ranked by count times their idf over the stored job corpus (jobs_index),
+# so words every posting uses sink below the distinctive ones.
+MIN_TERM_LENGTH = 2
+TERM_TABLE_SIZE = 512
+
+_term_tables = OrderedDict()
+
+
+def term_table(text, analyze=analyze_text):
+    # Lemma -> count for a text, kept for the most recent TERM_TABLE_SIZE texts
+    key = text_key(text)
+    if key in _term_tables:
+        _term_tables.move_to_end(key)
+        return _term_tables[key]
+
+    table = Counter(term for term in analyze(text) if len(term) >= MIN_TERM_LENGTH)
+    _term_tables[key] = table
+    while len(_term_tables) > TERM_TABLE_SIZE:
+        _term_tables.popitem(last=False)
+    return table
+
+
+def rank_terms(counts, top_k):
+    # Top (term, count, weight) by count * corpus idf, without sorting every
+    # term. Without a corpus index the weight is the count.
+    idf = term_idf(counts) or {}
+    scored = ((term, count, count * idf.get(term, 1.0)) for term, count in counts.items())
+    return heapq.nlargest(top_k, scored, key=lambda item: item[2])
+
+
+def missing_terms(resume_text, job_desc_text, top_k=20, analyze=analyze_text):
+    resume_terms = term_table(resume_text, analyze)
+    job_terms = term_table(job_desc_text, analyze)
+    gaps = {term: count for term, count in job_terms.items() if term not in resume_terms}
+    return rank_terms(gaps, top_k)
+
+
+def top_keywords(text, top_k=10, analyze=analyze_text):
+    return [term for term, _, _ in rank_terms(term_table(text, analyze), top_k)]
+
+
+@span("keywords.suggestions")
+def get_suggestions(resume_text, job_desc_text, analyze=analyze_text):
+    missing_keywords = missing_terms(resume_text, job_desc_text, 20, analyze)
+
+    suggestions = "### 🔍 Ranked Missing Keywords (Most Important First):\n\n"
+    if missing_keywords:
+        for kw, freq, _ in missing_keywords:
+            suggestions += f"- **{kw}** (mentioned {freq} times)\n"
+        suggestions += "\n📌 Try incorporating the above keywords to better align your resume."
+    else:
+        suggestions += "Your resume already includes most of the important keywords from the job description!"
+
+    return suggestions
+
+
+@span("keywords.matching")
+def keyword_matching(resume_text, job_desc_text, analyze=analyze_text):
+    resume_tokens = term_table(resume_text, analyze).keys()
+    job_tokens = term_table(job_desc_text, analyze).keys()
+
+    matched = job_tokens & resume_tokens
+    missing = job_tokens - resume_tokens
+
+    def highlight_keywords(words, color):
+        return ", ".join([f"<span style='color:{color}'>{w}</span>" for w in sorted(words)])
+
+    matched_str = highlight_keywords(matched, "green")
+    missing_str = highlight_keywords(missing, "red")
+
+    return matched_str, missing_str
@@ -0,0 +1,121 @@
+from collections import Counter
+
+import numpy as np
+
+from instrumentation import span
+from job_index import analyze
+from matching import weighted_section_score
+from resume_sections import DEFAULT_SECTION, match_header
+
+# Live match scores for the resume editor. The scorer keeps term counts per
+# line, for the whole resume and per section; an edit re-tokenizes only the
+# lines that changed and applies their count differences. Scores are then
+# recomputed from the counts with the same tf-idf weighting as
+# matching.score_resume (job description, resume and sections as documents),
+# so they agree with the analyzer page.
+
+
+class LiveScorer:
+    def __init__(self, job_desc_text, weights=None):
+        self.job_counts = Counter(analyze(job_desc_text))
+        self.weights = weights
+        self.lines = []
+        # Per line: (header section or None, counts for the resume, counts for
+        # the section the line belongs to) and that section
+        self.records = []
+        self.sections = []
+        self.resume_counts = Counter()
+        self.section_counts = {}
+
+    def _record(self, line):
+        counts = Counter(analyze(line))
+        header = match_header(line)
+        if header is None:
+            return None, counts, counts
+        name, inline = header
+        # The header words themselves only count towards the whole resume
+        return name, counts, Counter(analyze(line[inline:])) if inline is not None else Counter()
+
+    def _apply(self, record, section, sign):
+        _, counts, section_counts = record
+        _add(self.resume_counts, counts, sign)
+        _add(self.section_counts.setdefault(section, Counter()), section_counts, sign)
+
+    @span("scoring.live_update")
+    def update(self, text):
+        # Applies the edit that turns the previous text into text and returns
+        # (section_scores, overall_score, weighted_score)
+        lines = text.split("\n")
+        old = self.lines
+        limit = min(len(old), len(lines))
+        prefix = 0
+        while prefix < limit and old[prefix] == lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix] == lines[-1 - suffix]:
+            suffix += 1
+        old_end, new_end = len(old) - suffix, len(lines) - suffix
+
+        for i in range(prefix, old_end):
+            self._apply(self.records[i], self.sections[i], -1)
+        current = self.sections[prefix - 1] if prefix else DEFAULT_SECTION
+        records, sections = [], []
+        for line in lines[prefix:new_end]:
+            record = self._record(line)
+            current = record[0] or current
+            records.append(record)
+            sections.append(current)
+            self._apply(record, current, 1)
+
+        # Unchanged lines up to the next header follow the section in effect
+        # after the edit (a header may have been added or removed)
+        tail_records, tail_sections = self.records[old_end:], self.sections[old_end:]
+        for j, record in enumerate(tail_records):
+            if record[0] or tail_sections[j] == current:
+                break
+            self._apply(record, tail_sections[j], -1)
+            self._apply(record, current, 1)
+            tail_sections[j] = current
+
+        self.lines = lines
+        self.records = self.records[:prefix] + records + tail_records
+        self.sections = self.sections[:prefix] + sections + tail_sections
+        return self.scores()
+
+    def section_names(self):
+        names = [DEFAULT_SECTION]
+        for header, _, _ in self.records:
+            if header and header not in names:
+                names.append(header)
+        return names
+
+    def scores(self):
+        names = self.section_names()
+        docs = [self.job_counts, self.resume_counts] + [self.section_counts.get(name, {}) for name in names]
+        terms = {term: i for i, term in enumerate(set(self.job_counts) | set(self.resume_counts))}
+        if terms:
+            counts = np.zeros((len(docs), len(terms)))
+            for row, doc in enumerate(docs):
+                if doc:
+                    counts[row, [terms[term] for term in doc]] = list(doc.values())
+            # Smoothed idf and L2 rows, as TfidfVectorizer computes them
+            df = np.count_nonzero(counts, axis=0)
+            weights = counts * (np.log((1 + len(docs)) / (1 + df)) + 1)
+            norms = np.linalg.norm(weights, axis=1)
+            norms[norms == 0] = 1
+            weights /= norms[:, None]
+            scores = np.round(weights[1:] @ weights[0] * 100, 2)
+        else:
+            scores = np.zeros(len(docs) - 1)
+
+        section_scores = {name: float(score) for name, score in zip(names, scores[1:])}
+        return section_scores, float(scores[0]), weighted_section_score(section_scores, self.weights)
+
+
+def _add(total, counts, sign):
+    for term, count in counts.items():
+        value = total[term] + sign * count
+        if value:
+            total[term] = value
+        else:
+            del total[term]
@@ -0,0 +1,91 @@
+import numpy as np
+
+from instrumentation import span
+from resume_sections import split_resume_sections
+
+
+@span("scoring.similarity")
+def calculate_similarity(text1, text2):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    tfidf = TfidfVectorizer().fit_transform([text1, text2])
+    score = cosine_similarity(tfidf[0:1], tfidf[1:2])
+    return round(float(score[0][0]) * 100, 2)
+
+
+@span("scoring.score_resume")
+def score_resume(sections, job_desc_text, resume_text=None, weights=None):
+    # Every section score and the overall score from one vectorizer fit over
+    # the job description, the full resume and all sections, and one sparse
+    # product. Returns (section_scores, overall_score, weighted_score); the
+    # weighted score is None unless per-section weights are given.
+    names = list(sections)
+    if resume_text is None:
+        resume_text = " ".join(sections.values())
+
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    try:
+        tfidf = TfidfVectorizer().fit_transform([job_desc_text, resume_text] + [sections[name] for name in names])
+        scores = (tfidf[1:] @ tfidf[0].T).toarray().ravel()
+    except ValueError:
+        scores = np.zeros(len(names) + 1)
+    scores = np.round(scores * 100, 2)
+
+    section_scores = {name: float(score) if sections[name] else 0.0 for name, score in zip(names, scores[1:])}
+    overall_score = float(scores[0])
+
+    return section_scores, overall_score, weighted_section_score(section_scores, weights)
+
+
+def weighted_section_score(section_scores, weights):
+    if not weights:
+        return None
+    total_weight = sum(weights.get(name, 0) for name in section_scores)
+    if not total_weight:
+        return None
+    weighted = sum(weights.get(name, 0) * score for name, score in section_scores.items())
+    return round(weighted / total_weight, 2)
+
+
+def calculate_section_scores(sections, job_desc_text):
+    return score_resume(sections, job_desc_text)[0]
+
+
+def top_k_indices(scores, k):
+    # argpartition gives the k best in O(n); only those k get sorted
+    if k is None or k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    if k <= 0:
+        return np.array([], dtype=np.intp)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+@span("scoring.rank_jobs")
+def rank_jobs(resume_text, jobs, top_k=None, semantic_weight=0.0):
+    # semantic_weight > 0 blends in the embedding score (job_embeddings);
+    # needs the vectors model installed
+    if not jobs:
+        return []
+
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    descriptions = [job.get("description", "") or "" for job in jobs]
+    try:
+        # One vocabulary for the whole corpus, resume included as the last row
+        tfidf = TfidfVectorizer().fit_transform(descriptions + [resume_text])
+    except ValueError:
+        # Empty vocabulary, nothing can match
+        return [(job, 0.0) for job in jobs[:top_k]]
+
+    # Rows are L2-normalized, so one sparse mat-vec gives every cosine score
+    scores = (tfidf[:-1] @ tfidf[-1].T).toarray().ravel()
+
+    if semantic_weight:
+        from job_embeddings import hybrid_scores, job_vectors, semantic_scores
+
+        scores = hybrid_scores(scores, semantic_scores(resume_text, job_vectors(jobs)), semantic_weight)
+
+    return [(jobs[i], float(scores[i])) for i in top_k_indices(scores, top_k)]
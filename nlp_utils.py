@@ -0,0 +1,86 @@
+import hashlib
+import importlib.util
+from collections import OrderedDict
+
+from instrumentation import span
+
+MODEL_NAME = "en_core_web_sm"
+# Only lemmas and stop-word flags are used; the tagger and attribute ruler
+# that the lemmatizer depends on stay enabled
+DISABLED_COMPONENTS = ["parser", "ner"]
+ANALYSIS_CACHE_SIZE = 256
+LEMMATIZE_BATCH_SIZE = 2000
+# Static word vectors for the optional semantic mode. Models are never
+# downloaded on demand; setup_models.py installs them once, online or from
+# local wheels.
+VECTOR_MODEL_NAME = "en_core_web_md"
+VECTOR_EXCLUDED_COMPONENTS = ["tok2vec", "tagger", "parser", "senter", "attribute_ruler", "lemmatizer", "ner"]
+
+_nlp = None
+_vector_nlp = None
+_analysis_cache = OrderedDict()
+
+
+@span("nlp.load_model")
+def _load(name, **kwargs):
+    # spaCy is imported on first use, not when this module is imported
+    import spacy
+
+    try:
+        return spacy.load(name, **kwargs)
+    except OSError as e:
+        raise OSError(f"spaCy model '{name}' is not installed. Run: python setup_models.py") from e
+
+
+def get_nlp():
+    global _nlp
+    if _nlp is None:
+        _nlp = _load(MODEL_NAME, disable=DISABLED_COMPONENTS)
+    return _nlp
+
+
+def model_installed(name):
+    return importlib.util.find_spec(name) is not None
+
+
+def vectors_available():
+    return _vector_nlp is not None or model_installed(VECTOR_MODEL_NAME)
+
+
+def get_vector_nlp():
+    # Only the tokenizer and the vectors table are needed
+    global _vector_nlp
+    if _vector_nlp is None:
+        _vector_nlp = _load(VECTOR_MODEL_NAME, exclude=VECTOR_EXCLUDED_COMPONENTS)
+    return _vector_nlp
+
+
+def text_key(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def lemmas_from_doc(doc):
+    return tuple(token.lemma_ for token in doc if token.is_alpha and not token.is_stop)
+
+
+@span("nlp.analyze")
+def analyze_text(text):
+    # Lemmas of the alphabetic, non-stop-word tokens, in document order.
+    # Each distinct text goes through the pipeline once.
+    key = text_key(text)
+    if key in _analysis_cache:
+        _analysis_cache.move_to_end(key)
+        return _analysis_cache[key]
+
+    lemmas = lemmas_from_doc(get_nlp()(text.lower()))
+    _analysis_cache[key] = lemmas
+    while len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+        _analysis_cache.popitem(last=False)
+    return lemmas
+
+
+def lemmatize_terms(terms):
+    # Lemma of each single-word term (e.g. an index vocabulary), out of context
+    nlp = get_nlp()
+    return ["".join(token.lemma_ for token in doc) or term
+            for term, doc in zip(terms, nlp.pipe(terms, batch_size=LEMMATIZE_BATCH_SIZE))]
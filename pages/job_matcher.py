@@ -1,40 +1,29 @@
 import streamlit as st
-import requests
-import pdfplumber
 from datetime import datetime, timezone
 from dateutil import parser
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import nltk
-from nltk.corpus import stopwords
-import string
-from collections import Counter
 
-# Download stopwords once
-nltk.download('stopwords')
+from app_cache import analysis, corpus_ranking, iter_feed_jobs, job_ranking, refresh_jobs
+from pdf_utils import extract_text_from_pdf
+from job_dedup import content_hash
+from job_embeddings import SEMANTIC_WEIGHT, semantic_available
+from keywords import top_keywords
+from nlp_utils import text_key
 
-# Adzuna credentials
-ADZUNA_APP_ID = "b841a9e9"
-ADZUNA_APP_KEY = "a2cb932c2d2c2f9c142f75ee5a9bb7b0"
-
-COUNTRY_CODE = "in"
 DESIRED_LOCATIONS = ["Nashik", "Maharashtra", "India"]
+JOB_SOURCES = ["Live job feeds", "Local corpus (jobs.db)"]
+CORPUS_TOP_K = 50
 
+# Saved jobs keyed by content hash, so saving the same posting twice is a no-op
 if 'saved_jobs' not in st.session_state:
-    st.session_state.saved_jobs = []
-
-def extract_text_from_pdf(pdf_file):
-    with pdfplumber.open(pdf_file) as pdf:
-        return " ".join([page.extract_text() for page in pdf.pages if page.extract_text()])
+    st.session_state.saved_jobs = {}
 
-def calculate_similarity(resume_text, job_text):
-    tfidf = TfidfVectorizer().fit_transform([resume_text, job_text])
-    score = cosine_similarity(tfidf[0:1], tfidf[1:2])
-    return float(score[0][0])
-
-def format_posting_date(created_str):
+def format_posting_date(created):
     try:
-        post_time = parser.parse(created_str)
+        if isinstance(created, int):
+            # Cached postings carry a pre-parsed epoch
+            post_time = datetime.fromtimestamp(created, timezone.utc)
+        else:
+            post_time = parser.parse(created)
         if post_time.tzinfo is None:
             post_time = post_time.replace(tzinfo=timezone.utc)
         now = datetime.now(timezone.utc)
@@ -55,66 +44,9 @@ def format_posting_date(created_str):
     except Exception:
         return ""
 
-def fetch_adzuna_jobs(keyword):
-    url = f"https://api.adzuna.com/v1/api/jobs/{COUNTRY_CODE}/search/1"
-    params = {
-        "app_id": ADZUNA_APP_ID,
-        "app_key": ADZUNA_APP_KEY,
-        "results_per_page": 50,
-        "what": keyword,
-        "content-type": "application/json"
-    }
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
-        jobs_data = response.json().get("results", [])
-        return [
-            {
-                "title": job.get("title", "No Title"),
-                "description": job.get("description", ""),
-                "redirect_url": job.get("redirect_url", ""),
-                "source": "Adzuna",
-                "created": job.get("created", ""),
-                "location": job.get("location", {}).get("display_name", "")
-            }
-            for job in jobs_data
-        ]
-    return []
-
-def fetch_remotive_jobs():
-    response = requests.get("https://remotive.io/api/remote-jobs")
-    now = datetime.now(timezone.utc)
-    if response.status_code == 200:
-        jobs_data = response.json().get("jobs", [])
-        filtered_jobs = []
-        for job in jobs_data:
-            pub_date_str = job.get("publication_date")
-            if pub_date_str:
-                pub_date = parser.parse(pub_date_str)
-                if pub_date.tzinfo is None:
-                    pub_date = pub_date.replace(tzinfo=timezone.utc)
-                if (now - pub_date).days <= 14:
-                    filtered_jobs.append({
-                        "title": job.get("title", "No Title"),
-                        "description": job.get("description", ""),
-                        "redirect_url": job.get("url", ""),
-                        "source": "Remotive",
-                        "created": pub_date_str,
-                        "location": job.get("candidate_required_location", "")
-                    })
-        return filtered_jobs
-    return []
-
 def extract_meaningful_keywords(text, top_n=10):
-    stop_words = set(stopwords.words('english'))
-    words = text.lower().split()
-    cleaned_words = []
-    for w in words:
-        w = w.strip(string.punctuation)
-        if len(w) > 3 and w not in stop_words and w.isalpha():
-            cleaned_words.append(w)
-    word_counts = Counter(cleaned_words)
-    most_common = word_counts.most_common(top_n)
-    return [word for word, count in most_common]
+    # Same engine and corpus weighting as the analyzer's keyword suggestions
+    return top_keywords(text, top_n, analyze=analysis)
 
 # --- Streamlit UI ---
 
@@ -122,6 +54,12 @@ st.set_page_config(page_title="Job Matcher", page_icon="🔍")
 st.title("🔍 Job Matcher - Find Jobs That Align With Your Resume")
 
 resume_file = st.file_uploader("📄 Upload your Resume (PDF)", type=["pdf"])
+# Blends word-vector similarity into the score, so "ML" can match "machine learning"
+semantic_mode = semantic_available() and st.checkbox("🧠 Semantic matching", value=False)
+# The local corpus is filled by ingest.py and searched through its index
+job_source = st.radio("Job source", JOB_SOURCES, horizontal=True)
+if job_source == JOB_SOURCES[0] and st.button("🔄 Refresh job feeds"):
+    refresh_jobs("developer")
 
 if resume_file:
     with st.spinner("Extracting text and matching jobs..."):
@@ -130,23 +68,28 @@ if resume_file:
         keywords = extract_meaningful_keywords(resume_text)
         st.markdown(f"📌 Auto-detected Job Keywords: {', '.join(keywords)}")
 
-        adzuna_jobs = fetch_adzuna_jobs("developer")
-        remotive_jobs = fetch_remotive_jobs()
-        all_jobs = adzuna_jobs + remotive_jobs
-
-        filtered_jobs = [
-            job for job in all_jobs
-            if any(loc.lower() in job.get("location", "").lower() for loc in DESIRED_LOCATIONS)
-        ]
+        semantic_weight = SEMANTIC_WEIGHT if semantic_mode else 0.0
+        if job_source == JOB_SOURCES[1]:
+            similarity_scores = corpus_ranking(resume_text, CORPUS_TOP_K, DESIRED_LOCATIONS, semantic_weight)
+            st.caption(f"Searched the local corpus for the top {CORPUS_TOP_K} jobs")
+        else:
+            # Served from jobs.db; feeds past their TTL are revalidated
+            # concurrently and collected as each one finishes
+            fetch_status = st.empty()
+            all_jobs, stamps = [], []
+            for source, jobs in iter_feed_jobs("developer", stamps):
+                all_jobs.extend(jobs)
+                fetch_status.caption(f"Fetched {len(jobs)} jobs from {source} ({len(all_jobs)} total)")
 
-        jobs_to_match = filtered_jobs if filtered_jobs else all_jobs
+            filtered_jobs = [
+                job for job in all_jobs
+                if any(loc.lower() in job.get("location", "").lower() for loc in DESIRED_LOCATIONS)
+            ]
 
-        similarity_scores = []
-        for job in jobs_to_match:
-            score = calculate_similarity(resume_text, job["description"])
-            similarity_scores.append((job, score))
+            jobs_to_match = filtered_jobs if filtered_jobs else all_jobs
 
-        similarity_scores.sort(key=lambda x: x[1], reverse=True)
+            similarity_scores = job_ranking(text_key(resume_text), ("developer", tuple(sorted(stamps))),
+                                            resume_text, jobs_to_match, semantic_weight=semantic_weight)
 
         tab1, tab2 = st.tabs(["🎯 Matching Jobs", "💾 Saved Jobs"])
 
@@ -157,9 +100,9 @@ if resume_file:
             if matches:
                 for idx, (job, score) in enumerate(matches):
                     title = job["title"]
-                    source = job["source"]
-                    post_date = format_posting_date(job.get("created", ""))
-                    url = job["redirect_url"] or f"https://www.google.com/search?q={title.replace(' ', '+')}+job"
+                    source = job.get("source") or "Local"
+                    post_date = format_posting_date(job.get("posted_at") or job.get("created", ""))
+                    url = job.get("redirect_url") or f"https://www.google.com/search?q={title.replace(' ', '+')}+job"
 
                     st.markdown(f"### ✅ {title} ({source})")
                     st.markdown(f"**Match Score:** {round(score * 100, 2)}%")
@@ -168,8 +111,9 @@ if resume_file:
                     st.markdown(f"[👉 Apply Now]({url})", unsafe_allow_html=True)
 
                     if st.button(f"⭐ Save Job #{idx}"):
-                        if job not in st.session_state.saved_jobs:
-                            st.session_state.saved_jobs.append(job)
+                        key = content_hash(job)
+                        if key not in st.session_state.saved_jobs:
+                            st.session_state.saved_jobs[key] = job
                             st.success(f"Saved job: {title}")
                     st.markdown("---")
             else:
@@ -178,11 +122,11 @@ if resume_file:
         with tab2:
             st.header("💾 Saved Jobs")
             if st.session_state.saved_jobs:
-                for idx, job in enumerate(st.session_state.saved_jobs):
+                for idx, (key, job) in enumerate(list(st.session_state.saved_jobs.items())):
                     title = job["title"]
-                    source = job["source"]
-                    post_date = format_posting_date(job.get("created", ""))
-                    url = job["redirect_url"] or f"https://www.google.com/search?q={title.replace(' ', '+')}+job"
+                    source = job.get("source") or "Local"
+                    post_date = format_posting_date(job.get("posted_at") or job.get("created", ""))
+                    url = job.get("redirect_url") or f"https://www.google.com/search?q={title.replace(' ', '+')}+job"
 
                     st.markdown(f"### ✅ {title} ({source})")
                     st.markdown(f"📍 Location: {job.get('location', 'N/A')}")
@@ -190,7 +134,7 @@ if resume_file:
                     st.markdown(f"[👉 Apply Now]({url})", unsafe_allow_html=True)
 
                     if st.button(f"❌ Remove Saved Job #{idx}"):
-                        st.session_state.saved_jobs.pop(idx)
+                        del st.session_state.saved_jobs[key]
                         st.experimental_rerun()
                     st.markdown("---")
             else:
@@ -1,42 +1,51 @@
 import streamlit as st
-import pdfplumber
-from fpdf import FPDF
 import os
 import datetime
+import time
 
-st.title("🛠 Resume Editor")
-
-def extract_text_from_pdf(pdf_file):
-    with pdfplumber.open(pdf_file) as pdf:
-        return "\n".join([page.extract_text() or "" for page in pdf.pages])
-
-def save_text_as_pdf(text, filename):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
+from live_scoring import LiveScorer
+from nlp_utils import text_key
+from pdf_render import save_text_as_pdf
+from pdf_utils import extract_text_from_pdf
+from resume_sections import SECTION_WEIGHTS
 
-    # Update this path to your absolute path for the font file
-    font_path = r"C:\Users\DELL\Desktop\OJT\resume_match_app\fonts\DejaVuSans.ttf"
-    if not os.path.isfile(font_path):
-        st.error(f"Font file not found at {font_path}. Please add the font file.")
-        return
-
-    pdf.add_font('DejaVu', '', font_path, uni=True)
-    pdf.set_font("DejaVu", size=12)
-
-    for line in text.split('\n'):
-        pdf.multi_cell(0, 10, line)
-    pdf.output(filename)
+st.title("🛠 Resume Editor")
 
 uploaded_file = st.file_uploader("Upload your Resume PDF to edit", type=["pdf"])
 
+def live_scores(job_desc, text):
+    # One scorer per job description, kept in the session; each rerun only
+    # re-tokenizes the lines edited since the last one
+    key = text_key(job_desc)
+    scorer = st.session_state.get("live_scorer")
+    if scorer is None or st.session_state.get("live_scorer_job") != key:
+        scorer = LiveScorer(job_desc, SECTION_WEIGHTS)
+        st.session_state["live_scorer"] = scorer
+        st.session_state["live_scorer_job"] = key
+    return scorer.update(text)
+
 if uploaded_file:
-    resume_text = extract_text_from_pdf(uploaded_file)
-    st.session_state["resume_text"] = resume_text
+    # The PDF is parsed once per upload; reruns keep the edited text
+    if st.session_state.get("resume_file_id") != uploaded_file.file_id:
+        st.session_state["resume_text"] = extract_text_from_pdf(uploaded_file)
+        st.session_state["resume_file_id"] = uploaded_file.file_id
 
     edited_text = st.text_area("Edit your resume text below:", value=st.session_state.get("resume_text", ""), height=400)
     st.session_state["resume_text"] = edited_text
 
+    job_desc = st.text_area("Paste a job description to score your edits live (optional):", height=150)
+    if job_desc:
+        started = time.perf_counter()
+        section_scores, score, weighted_score = live_scores(job_desc, edited_text)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        col1, col2 = st.columns(2)
+        col1.metric("Match Score", f"{score}%")
+        if weighted_score is not None:
+            col2.metric("Weighted Section Score", f"{weighted_score}%")
+        st.caption(" · ".join(f"{section}: {section_score}%" for section, section_score in section_scores.items())
+                   + f" — updated in {elapsed_ms:.1f} ms")
+
     if st.button("Save Edited Resume"):
         save_folder = "edited_resumes"
         os.makedirs(save_folder, exist_ok=True)
@@ -44,19 +53,18 @@ if uploaded_file:
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = os.path.join(save_folder, f"edited_resume_{timestamp}.pdf")
 
-        save_text_as_pdf(edited_text, filename)
-
-        if os.path.isfile(filename):
+        try:
+            pdf_bytes = save_text_as_pdf(edited_text, filename)
+        except OSError as e:
+            st.error(f"Failed to save PDF: {e}")
+        else:
             st.success(f"Edited resume saved as PDF: {filename}")
 
-            with open(filename, "rb") as f:
-                st.download_button(
-                    label="Download Edited Resume PDF",
-                    data=f,
-                    file_name=os.path.basename(filename),
-                    mime="application/pdf"
-                )
-        else:
-            st.error("Failed to save PDF. Please check the font file and try again.")
+            st.download_button(
+                label="Download Edited Resume PDF",
+                data=pdf_bytes,
+                file_name=os.path.basename(filename),
+                mime="application/pdf"
+            )
 else:
     st.info("Please upload a PDF file to start editing.")
@@ -0,0 +1,182 @@
+import argparse
+import io
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from worker_pool import default_workers, get_pool
+
+# Resume text -> PDF bytes. The DejaVu metrics are read once per process from
+# the bundled fonts/DejaVuSans.pkl (FPDF.add_font re-reads them, or re-parses
+# the TTF, on every call) and registered straight into each document; PDFs
+# are rendered in memory. Bulk exports fan out over the shared worker pool.
+# Relies on fpdf 1.7 internals (pinned in requirements.txt).
+FONT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts")
+FONT_NAME = "DejaVuSans"
+FONT_FAMILY = "DejaVu"
+FONT_SIZE = 12
+LINE_HEIGHT = 10
+PAGE_MARGIN = 15
+# Texts per task handed to a pool worker
+EXPORT_CHUNK_SIZE = 16
+
+# Embedded font subsets by character set; resumes mostly share one
+SUBSET_CACHE_SIZE = 64
+
+_registry = {}
+_subsets = OrderedDict()
+# Export threads share _subsets; subsets are built outside the lock
+_subsets_lock = threading.Lock()
+_fpdf = {"FPDF": None}
+
+
+class _GlyphSubset(list):
+    # fpdf appends every character it writes to the font's subset list and
+    # later tests `cid in subset` for each of the font's 65k code points; keep
+    # one entry per character and answer membership from a set
+    def __init__(self, codes):
+        super().__init__(codes)
+        self.codes = set(codes)
+
+    def append(self, code):
+        if code not in self.codes:
+            self.codes.add(code)
+            super().append(code)
+
+    def __contains__(self, code):
+        return code in self.codes
+
+
+def _load_fpdf():
+    # FPDF subclass with TTF subsetting memoized: makeSubset re-parses the
+    # whole font file for every document otherwise. Only documents made here
+    # use it; fpdf itself is left unpatched.
+    if _fpdf["FPDF"] is None:
+        import types
+
+        import fpdf.fpdf
+        from fpdf.ttfonts import TTFontFile
+
+        class CachedTTFontFile(TTFontFile):
+            def makeSubset(self, file, subset):
+                key = (file, frozenset(subset))
+                with _subsets_lock:
+                    cached = _subsets.get(key)
+                    if cached is not None:
+                        _subsets.move_to_end(key)
+                if cached is None:
+                    stream = super().makeSubset(file, subset)
+                    cached = (stream, self.codeToGlyph, self.maxUni)
+                    with _subsets_lock:
+                        _subsets[key] = cached
+                        while len(_subsets) > SUBSET_CACHE_SIZE:
+                            _subsets.popitem(last=False)
+                stream, self.codeToGlyph, self.maxUni = cached
+                return stream
+
+        putfonts = fpdf.fpdf.FPDF._putfonts
+
+        class CachedFPDF(fpdf.fpdf.FPDF):
+            # fpdf's own _putfonts, looking TTFontFile up in a copy of its
+            # module globals that has the cached class instead
+            _putfonts = types.FunctionType(putfonts.__code__,
+                                           dict(vars(fpdf.fpdf), TTFontFile=CachedTTFontFile),
+                                           putfonts.__name__, putfonts.__defaults__, putfonts.__closure__)
+
+        _fpdf["FPDF"] = CachedFPDF
+    return _fpdf["FPDF"]
+
+
+def font_metrics(name=FONT_NAME):
+    # The pickled metrics, pointed at the TTF next to them (the shipped pickle
+    # records the path of the machine that generated it)
+    if name not in _registry:
+        metrics_path = os.path.join(FONT_DIR, f"{name}.pkl")
+        with open(metrics_path, "rb") as f:
+            metrics = pickle.load(f)
+        metrics["ttffile"] = os.path.join(FONT_DIR, f"{name}.ttf")
+        metrics["unifilename"] = metrics_path
+        _registry[name] = metrics
+    return _registry[name]
+
+
+def _register_font(pdf, family=FONT_FAMILY, name=FONT_NAME):
+    # Equivalent of pdf.add_font(family, '', ttf, uni=True) for fpdf 1.7,
+    # without touching the filesystem. Output finds the glyph-width cache
+    # (fonts/<name>.cw127.pkl) through unifilename.
+    metrics = font_metrics(name)
+    fontkey = family.lower()
+    pdf.fonts[fontkey] = {
+        "i": len(pdf.fonts) + 1, "type": metrics["type"], "name": metrics["name"], "desc": metrics["desc"],
+        "up": metrics["up"], "ut": metrics["ut"], "cw": metrics["cw"], "ttffile": metrics["ttffile"],
+        "fontkey": fontkey, "subset": _GlyphSubset(range(57 if hasattr(pdf, "str_alias_nb_pages") else 32)),
+        "unifilename": metrics["unifilename"],
+    }
+    pdf.font_files[fontkey] = {"length1": metrics["originalsize"], "type": "TTF", "ttffile": metrics["ttffile"]}
+    pdf.font_files[metrics["ttffile"]] = {"type": "TTF"}
+
+
+def render_pdf(text):
+    # One line of text per multi_cell, as the editor and analyzer always did.
+    # Returns the PDF as a BytesIO.
+    pdf = _load_fpdf()()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=PAGE_MARGIN)
+    _register_font(pdf)
+    pdf.set_font(FONT_FAMILY, size=FONT_SIZE)
+    for line in text.split("\n"):
+        pdf.multi_cell(0, LINE_HEIGHT, line)
+    # fpdf 1.7 returns the document as a latin-1 str
+    return io.BytesIO(pdf.output(dest="S").encode("latin-1"))
+
+
+def save_text_as_pdf(text, filename):
+    data = render_pdf(text).getvalue()
+    with open(filename, "wb") as f:
+        f.write(data)
+    return data
+
+
+def _export_chunk(jobs):
+    for filename, text in jobs:
+        save_text_as_pdf(text, filename)
+    return [filename for filename, _ in jobs]
+
+
+def export_pdfs(jobs, workers=None, chunk_size=EXPORT_CHUNK_SIZE):
+    # Renders (filename, text) pairs on the shared process pool; each worker
+    # loads the font metrics once. Returns the written filenames in input order.
+    jobs = list(jobs)
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+    if workers is None:
+        workers = default_workers()
+    if workers <= 1 or len(chunks) <= 1:
+        return [filename for chunk in chunks for filename in _export_chunk(chunk)]
+    return [filename for done in get_pool(workers).map(_export_chunk, chunks) for filename in done]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render resume text files to PDF in bulk.")
+    parser.add_argument("inputs", nargs="+", help="text files to render")
+    parser.add_argument("--output", default="exported_resumes", help="directory for the PDFs")
+    parser.add_argument("--workers", type=int, help="processes to use (default: up to 4)")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    jobs = []
+    for path in args.inputs:
+        with open(path, encoding="utf-8") as f:
+            name = os.path.splitext(os.path.basename(path))[0] + ".pdf"
+            jobs.append((os.path.join(args.output, name), f.read()))
+    started = time.perf_counter()
+    written = export_pdfs(jobs, args.workers)
+    elapsed = time.perf_counter() - started
+    print(f"✅ {len(written)} PDFs in {elapsed:.1f}s ({len(written) / elapsed:.0f}/s) → {args.output}",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
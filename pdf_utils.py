@@ -0,0 +1,191 @@
+import hashlib
+import io
+import os
+from collections import OrderedDict
+
+from instrumentation import span
+from worker_pool import default_workers, get_pool
+
+# Extracted text is cached by the SHA-256 of the PDF bytes: a bounded in-memory
+# LRU in front of one text file per document on disk.
+CACHE_DIR = os.path.join(".cache", "pdf_text")
+MEMORY_CACHE_SIZE = 32
+# Resume text is personal data, so the disk tier is bounded too: past either
+# limit the least recently used files (by mtime, refreshed on every hit) are
+# deleted. DISK_CACHE_FILES = 0 turns the disk tier off.
+DISK_CACHE_FILES = 200
+DISK_CACHE_BYTES = 20 * 1024 * 1024
+
+# Documents shorter than this are parsed in-process; a pool is not worth it
+PARALLEL_MIN_PAGES = 8
+PAGES_PER_CHUNK = 4
+
+_memory_cache = OrderedDict()
+
+
+def read_pdf_bytes(pdf_file):
+    if isinstance(pdf_file, (bytes, bytearray)):
+        return bytes(pdf_file)
+    if isinstance(pdf_file, (str, os.PathLike)):
+        with open(pdf_file, "rb") as f:
+            return f.read()
+    # Streamlit's UploadedFile and other file-like objects
+    if hasattr(pdf_file, "getvalue"):
+        return pdf_file.getvalue()
+    pdf_file.seek(0)
+    data = pdf_file.read()
+    pdf_file.seek(0)
+    return data
+
+
+def pdf_hash(pdf_bytes):
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def _extract_page_range(pdf_bytes, start, end):
+    # Runs in a worker process
+    import pdfplumber
+
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        # extract_text() runs layout analysis, so call it once per page
+        return [page.extract_text() or "" for page in pdf.pages[start:end]]
+
+
+def iter_pdf_pages(pdf_file, workers=None, chunk_pages=PAGES_PER_CHUNK):
+    # Yields the text of every page in order. Large documents are split into
+    # page ranges parsed by the shared process pool; pages are yielded as soon
+    # as their range is done, while later ranges keep running.
+    import pdfplumber
+
+    pdf_bytes = read_pdf_bytes(pdf_file)
+    if workers is None:
+        workers = default_workers()
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        page_count = len(pdf.pages)
+        if workers <= 1 or page_count < PARALLEL_MIN_PAGES:
+            for page in pdf.pages:
+                yield page.extract_text() or ""
+            return
+
+    pool = get_pool(workers)
+    futures = [
+        pool.submit(_extract_page_range, pdf_bytes, start, min(start + chunk_pages, page_count))
+        for start in range(0, page_count, chunk_pages)
+    ]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        # Also reached when the caller stops iterating early
+        for future in futures:
+            future.cancel()
+
+
+def _join_pages(pages):
+    return "\n".join(text for text in pages if text)
+
+
+def _remember(key, text):
+    _memory_cache[key] = text
+    _memory_cache.move_to_end(key)
+    while len(_memory_cache) > MEMORY_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+
+
+def _disk_path(key):
+    return os.path.join(CACHE_DIR, f"{key}.txt")
+
+
+def _read_disk(key):
+    if not DISK_CACHE_FILES:
+        return None
+    try:
+        with open(_disk_path(key), encoding="utf-8") as f:
+            text = f.read()
+        os.utime(_disk_path(key))
+        return text
+    except OSError:
+        return None
+
+
+def _write_disk(key, text):
+    if not DISK_CACHE_FILES:
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = _disk_path(key) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, _disk_path(key))
+        _evict_disk()
+    except OSError:
+        # The disk tier is best effort, the memory tier still works
+        pass
+
+
+def _evict_disk():
+    # Least recently used first, until both limits hold
+    entries = sorted((entry.stat().st_mtime_ns, entry.stat().st_size, entry.path)
+                     for entry in os.scandir(CACHE_DIR) if entry.name.endswith(".txt"))
+    count, total = len(entries), sum(size for _, size, _ in entries)
+    for _, size, file_path in entries:
+        if count <= DISK_CACHE_FILES and total <= DISK_CACHE_BYTES:
+            break
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            # Evicted by another process
+            pass
+        count -= 1
+        total -= size
+
+
+def _cached_text(key):
+    if key in _memory_cache:
+        _memory_cache.move_to_end(key)
+        return _memory_cache[key]
+    text = _read_disk(key)
+    if text is not None:
+        _remember(key, text)
+    return text
+
+
+@span("pdf.extract_text")
+def extract_text_from_pdf(pdf_file, workers=None):
+    pdf_bytes = read_pdf_bytes(pdf_file)
+    key = pdf_hash(pdf_bytes)
+
+    text = _cached_text(key)
+    if text is None:
+        text = _join_pages(iter_pdf_pages(pdf_bytes, workers))
+        _write_disk(key, text)
+        _remember(key, text)
+    return text
+
+
+def iter_pdf_text(pdf_file, workers=None):
+    # Streaming variant of extract_text_from_pdf: yields page texts as they are
+    # parsed (or the whole cached text at once) and caches the result at the end
+    pdf_bytes = read_pdf_bytes(pdf_file)
+    key = pdf_hash(pdf_bytes)
+
+    text = _cached_text(key)
+    if text is not None:
+        yield text
+        return
+
+    pages = []
+    for page_text in iter_pdf_pages(pdf_bytes, workers):
+        if page_text:
+            pages.append(page_text)
+            yield page_text
+    text = _join_pages(pages)
+    _write_disk(key, text)
+    _remember(key, text)
+
+
+def clear_pdf_cache(disk=False):
+    _memory_cache.clear()
+    if disk and os.path.isdir(CACHE_DIR):
+        for name in os.listdir(CACHE_DIR):
+            os.remove(os.path.join(CACHE_DIR, name))
@@ -0,0 +1,126 @@
+import re
+
+from instrumentation import span
+
+# Header lexicon: lower-case alias -> section name. Extend it with
+# register_section_header(); the pattern is rebuilt on the next call.
+SECTION_HEADERS = {
+    "summary": "Summary",
+    "professional summary": "Summary",
+    "profile": "Summary",
+    "objective": "Objective",
+    "career objective": "Objective",
+    "experience": "Experience",
+    "work experience": "Experience",
+    "professional experience": "Experience",
+    "employment history": "Work History",
+    "work history": "Work History",
+    "skills": "Skills",
+    "technical skills": "Skills",
+    "education": "Education",
+    "certifications": "Certifications",
+    "certificates": "Certifications",
+    "projects": "Projects",
+}
+# Words allowed in front of an alias ("Relevant Experience", "Work Projects")
+HEADER_QUALIFIERS = ("technical", "professional", "work", "relevant")
+DEFAULT_SECTION = "Summary"
+# Relative weight of each section in the weighted match score
+SECTION_WEIGHTS = {
+    "Summary": 1,
+    "Objective": 1,
+    "Experience": 3,
+    "Work History": 3,
+    "Skills": 3,
+    "Projects": 2,
+    "Education": 1,
+    "Certifications": 1,
+}
+
+_pattern = {"headers": None, "regex": None}
+
+
+def register_section_header(alias, section):
+    SECTION_HEADERS[alias.lower()] = section
+
+
+def _header_regex():
+    if _pattern["headers"] != SECTION_HEADERS:
+        # Longest aliases first so "work experience" wins over "experience"
+        aliases = sorted(SECTION_HEADERS, key=len, reverse=True)
+        alternation = "|".join(re.escape(alias).replace(r"\ ", r"[ \t]+") for alias in aliases)
+        qualifiers = "|".join(HEADER_QUALIFIERS)
+        # A header is a line of its own: an optional qualifier, the alias, then
+        # either nothing, a dash, or a colon followed by inline content. Lines
+        # that merely use the word ("Excellent communication skills", "Years
+        # of experience") do not match.
+        _pattern["regex"] = re.compile(
+            rf"^[ \t•*-]*(?:(?:{qualifiers})[ \t]+)??(?P<header>{alternation})"
+            rf"[ \t]*(?:[:：][ \t]*(?P<inline>[^\n]*?)|[-–—]?)[ \t\r]*$",
+            re.IGNORECASE | re.MULTILINE,
+        )
+        _pattern["headers"] = dict(SECTION_HEADERS)
+    return _pattern["regex"]
+
+
+def match_header(line):
+    # (section, offset of the inline content or None) when a single line is
+    # a section header, else None
+    match = _header_regex().match(line)
+    if match is None:
+        return None
+    name = SECTION_HEADERS[" ".join(match.group("header").lower().split())]
+    return name, match.start("inline") if match.group("inline") else None
+
+
+def _add_span(spans, name, start, end):
+    spans.setdefault(name, []).append((start, end))
+
+
+def find_section_spans(text, base=0, spans=None, current=None):
+    # One regex pass over the text. Returns ({section: [(start, end), ...]},
+    # current section); offsets index into the original text (plus base).
+    # A section that appears twice gets two spans.
+    if spans is None:
+        spans = {DEFAULT_SECTION: []}
+    name, start = current if current else (DEFAULT_SECTION, base)
+    for match in _header_regex().finditer(text):
+        _add_span(spans, name, start, base + match.start())
+        name = SECTION_HEADERS[" ".join(match.group("header").lower().split())]
+        inline = match.start("inline") if match.group("inline") else -1
+        start = base + (inline if inline >= 0 else match.end())
+    return spans, (name, start)
+
+
+def segment_resume(resume_text):
+    # Accepts the full text or an iterable of page texts; pages are segmented
+    # as they arrive. Returns (text, spans) with pages joined by newlines.
+    if isinstance(resume_text, str):
+        spans, (name, start) = find_section_spans(resume_text)
+        _add_span(spans, name, start, len(resume_text))
+        return resume_text, spans
+
+    pages, spans, current, offset = [], None, None, 0
+    for page in resume_text:
+        if pages:
+            offset += 1
+        spans, current = find_section_spans(page, offset, spans, current)
+        pages.append(page)
+        offset += len(page)
+    text = "\n".join(pages)
+    if spans is None:
+        return text, {DEFAULT_SECTION: [(0, 0)]}
+    name, start = current
+    _add_span(spans, name, start, len(text))
+    return text, spans
+
+
+def section_text(text, spans):
+    # Lazily materialize a section: whitespace-normalized slices of the text
+    return " ".join(" ".join(text[start:end].split()) for start, end in spans if end > start).strip()
+
+
+@span("sections.split")
+def split_resume_sections(resume_text):
+    text, spans = segment_resume(resume_text)
+    return {name: section_text(text, section_spans) for name, section_spans in spans.items()}
@@ -0,0 +1,52 @@
+import argparse
+import importlib
+import subprocess
+import sys
+
+from nlp_utils import MODEL_NAME, VECTOR_MODEL_NAME, model_installed
+
+# One-off setup step for the language data the app loads at runtime. Nothing
+# is downloaded on import or on first use, so run this when building the image
+# (or once per machine). With --wheels DIR it installs from local wheel files
+# (e.g. en_core_web_sm-3.8.0-py3-none-any.whl) and never touches the network.
+
+
+def install_spacy_model(name, wheel_dir=None):
+    if model_installed(name):
+        print(f"✅ {name} already installed")
+        return True
+    if wheel_dir:
+        command = [sys.executable, "-m", "pip", "install", "--no-index", "--find-links", wheel_dir, name]
+        ok = subprocess.call(command) == 0
+    else:
+        from spacy.cli import download
+
+        try:
+            download(name)
+            ok = True
+        except SystemExit as e:
+            ok = not e.code
+    print(f"{'✅' if ok else '❌'} {name}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Install the spaCy models used by the app.")
+    parser.add_argument("--vectors", action="store_true", help=f"also install {VECTOR_MODEL_NAME} for semantic matching")
+    parser.add_argument("--wheels", metavar="DIR", help="install models from wheel files in DIR, offline")
+    args = parser.parse_args()
+
+    models = [MODEL_NAME] + ([VECTOR_MODEL_NAME] if args.vectors else [])
+    ok = all([install_spacy_model(name, args.wheels) for name in models])
+    if ok:
+        from job_index import update_lemmas
+
+        # Lemmatizes an existing index now rather than at its next import; the
+        # model may have been installed by this process
+        importlib.invalidate_caches()
+        update_lemmas()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
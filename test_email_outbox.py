@@ -0,0 +1,101 @@
+import socket
+import sys
+import time
+
+import pytest
+from aiosmtpd.controller import Controller
+
+import email_outbox
+import email_utils
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("reject"):
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope.rcpt_tos[0])
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def handler(tmp_path, monkeypatch):
+    # Local stub SMTP server instead of Gmail and a scratch outbox database,
+    # both fresh for each test; the worker is stopped before they go away
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    monkeypatch.setattr(email_utils, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(email_utils, "SMTP_PORT", controller.port)
+    monkeypatch.setattr(email_utils, "SMTP_SSL", False)
+    monkeypatch.setattr(email_utils, "EMAIL_USER", None)
+    monkeypatch.setattr(email_outbox, "OUTBOX_DB", str(tmp_path / "outbox.db"))
+    monkeypatch.setattr(email_outbox, "POLL_SECONDS", 0.05)
+    monkeypatch.setattr(email_outbox, "BACKOFF_SECONDS", 0.01)
+    yield handler
+    email_outbox.stop_worker()
+    controller.stop()
+
+
+def wait_for(message_ids, status, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if all(email_outbox.outbox_status(i)["status"] == status for i in message_ids):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_pending_messages_are_sent_after_restart(handler):
+    # Queued by an earlier process that exited before the worker sent it
+    now = time.time()
+    with email_outbox.get_connection() as conn:
+        message_id = conn.execute(
+            "INSERT INTO outbox (recipient, subject, body, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?)",
+            ("restart@example.com", "Hi", "Body", now, now)).lastrowid
+    assert email_outbox.resume_outbox()
+    assert wait_for([message_id], "sent")
+    assert handler.messages == ["restart@example.com"]
+
+
+def test_nothing_pending_does_not_start_the_worker(handler):
+    assert not email_outbox.resume_outbox()
+    assert email_outbox._worker["thread"] is None
+
+
+def test_messages_share_one_connection(handler):
+    ids = [email_outbox.enqueue_email(f"user{i}@example.com", "Hi", "Body") for i in range(5)]
+    assert wait_for(ids, "sent")
+    assert sorted(handler.messages) == sorted(f"user{i}@example.com" for i in range(5))
+    assert handler.connections == 1
+
+
+def test_rejected_message_is_dead_lettered(handler, monkeypatch):
+    monkeypatch.setattr(email_outbox, "MAX_ATTEMPTS", 3)
+    message_id = email_outbox.enqueue_email("reject@example.com", "Hi", "Body")
+    assert wait_for([message_id], "dead")
+    status = email_outbox.outbox_status(message_id)
+    assert status["attempts"] == 3 and "550" in status["last_error"]
+    assert handler.messages == []
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,81 @@
+import sys
+import zlib
+
+import numpy as np
+import pytest
+
+import array_store
+import job_ann
+import job_embeddings
+
+DIM = 16
+
+
+def fake_embed(texts):
+    # Same random unit vector for the same text, no spaCy model needed
+    vectors = np.stack([np.random.default_rng(zlib.crc32((text or "").encode())).normal(size=DIM) for text in texts])
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    # The ANN index is looked up in its default directory, so work in tmp_path
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(job_embeddings, "semantic_available", lambda: True)
+    monkeypatch.setattr(job_embeddings, "embed_texts", fake_embed)
+    monkeypatch.setattr(job_ann, "ANN_MIN_DOCS", 200)
+    for start in range(1, 301, 100):
+        job_embeddings.add_embeddings([(job_id, f"job {job_id}") for job_id in range(start, start + 100)])
+    job_ann.wait_for_ann_build()
+    return job_embeddings.EMBEDDINGS_DIR
+
+
+def delete(job_ids):
+    job_embeddings.delete_embeddings(job_ids)
+    job_ann.delete_from_ann(job_ids)
+
+
+def test_recovery_after_truncated_append(store_dir):
+    # An append that died before meta.json was written
+    for name in ("ids", "vectors", "deleted"):
+        with open(array_store.array_path(store_dir, name), "ab") as f:
+            f.write(b"\x07" * 12)
+    job_embeddings.add_embeddings([(job_id, f"job {job_id}") for job_id in range(301, 311)])
+    store = job_embeddings.load_embeddings(store_dir)
+    assert store["n_docs"] == 310 and store["alive"] is None
+    assert array_store.array_length(store_dir, "ids", np.int64) == 310
+    assert array_store.array_length(store_dir, "vectors", np.float32) == 310 * DIM
+    rows = job_embeddings.store_rows(store, [1, 300, 301, 310])
+    assert np.allclose(store["vectors"][rows], fake_embed([f"job {job_id}" for job_id in (1, 300, 301, 310)]))
+
+
+def test_store_rows(tmp_path, monkeypatch):
+    # Rebuilt out of id order, with a job stored twice, one deleted
+    monkeypatch.setattr(job_embeddings, "embed_texts", fake_embed)
+    store_dir = str(tmp_path / "vectors")
+    job_embeddings.build_embeddings([(5, "a"), (2, "b"), (9, "c"), (2, "d"), (7, "e")], store_dir)
+    job_embeddings.delete_embeddings([9], store_dir)
+    store = job_embeddings.load_embeddings(store_dir)
+    assert job_embeddings.store_rows(store, [2, 5, 7, 9, 1, 10, -1]).tolist() == [3, 0, 4, -1, -1, -1, -1]
+
+
+def test_brute_force_skips_deleted(store_dir):
+    before = job_embeddings.search_embeddings("query", 10, approximate=False)
+    deleted = {job_id for job_id, _ in before[:5]}
+    delete(deleted)
+    after = job_embeddings.search_embeddings("query", 10, approximate=False)
+    assert len(after) == 10 and not deleted & {job_id for job_id, _ in after}
+    assert [job_id for job_id, _ in after[:5]] == [job_id for job_id, _ in before[5:]]
+
+
+def test_ann_skips_deleted(store_dir):
+    assert job_ann.load_ann() is not None
+    before = job_embeddings.search_embeddings("query", 10)
+    deleted = {job_id for job_id, _ in before[:5]}
+    delete(deleted)
+    after = job_embeddings.search_embeddings("query", 10)
+    assert len(after) == 10 and not deleted & {job_id for job_id, _ in after}
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,120 @@
+import asyncio
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from aiohttp import web
+
+import feed_cache
+import job_database
+import job_feeds
+
+# Local stub standing in for the Adzuna and Remotive APIs
+calls = {"adzuna": 0, "remotive": 0, "failing": 0}
+
+
+async def adzuna_handler(request):
+    calls["adzuna"] += 1
+    page = request.match_info["page"]
+    return web.json_response({"results": [
+        {"title": f"Developer p{page}", "description": "python", "location": {"display_name": "Nashik"}}
+    ]})
+
+
+async def remotive_handler(request):
+    calls["remotive"] += 1
+    if calls["remotive"] == 1:
+        # First attempt fails, the client should retry
+        return web.Response(status=503)
+    return web.json_response({"jobs": [
+        {"title": "Remote Dev", "publication_date": datetime.now(timezone.utc).isoformat()},
+        {"title": "Old Dev", "publication_date": "2020-01-01T00:00:00"},
+    ]})
+
+
+async def failing_handler(request):
+    calls["failing"] += 1
+    return web.Response(status=503)
+
+
+async def slow_handler(request):
+    await asyncio.sleep(5)
+    return web.json_response({"results": []})
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    app = web.Application()
+    app.router.add_get("/adzuna/{country}/search/{page}", adzuna_handler)
+    app.router.add_get("/remotive", remotive_handler)
+    app.router.add_get("/failing/{country}/search/{page}", failing_handler)
+    app.router.add_get("/failing", failing_handler)
+    app.router.add_get("/slow/{country}/search/{page}", slow_handler)
+    loop = asyncio.new_event_loop()
+    # Handlers are cancelled when the client disconnects, so cleanup does not
+    # wait out slow_handler after a client timeout
+    runner = web.AppRunner(app, handler_cancellation=True)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(job_feeds, "BACKOFF_SECONDS", 0.01)
+    for name in calls:
+        calls[name] = 0
+
+
+def test_fetches_all_pages_and_retries(base_url, monkeypatch):
+    monkeypatch.setattr(job_feeds, "ADZUNA_URL", base_url + "/adzuna/{country}/search/{page}")
+    monkeypatch.setattr(job_feeds, "REMOTIVE_URL", base_url + "/remotive")
+    results = list(job_feeds.iter_jobs("developer", adzuna_pages=3))
+    sources = sorted(source for source, _ in results)
+    assert sources == ["Adzuna", "Adzuna", "Adzuna", "Remotive"]
+    jobs = [job for _, batch in results for job in batch]
+    assert {job["title"] for job in jobs} == {"Developer p1", "Developer p2", "Developer p3", "Remote Dev"}
+    assert calls["remotive"] == 2
+
+
+def test_slow_source_times_out(base_url, monkeypatch):
+    monkeypatch.setattr(job_feeds, "ADZUNA_URL", base_url + "/slow/{country}/search/{page}")
+    monkeypatch.setitem(job_feeds.SOURCE_TIMEOUTS, "Adzuna", 0.2)
+    monkeypatch.setattr(job_feeds, "MAX_RETRIES", 1)
+    start = time.perf_counter()
+    assert job_feeds.fetch_adzuna_jobs("developer", pages=2) == []
+    assert time.perf_counter() - start < 2
+
+
+
+def test_failed_feed_is_retried_once_per_interval(base_url, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(job_database, "DB_PATH", str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(job_feeds, "ADZUNA_URL", base_url + "/failing/{country}/search/{page}")
+    monkeypatch.setattr(job_feeds, "REMOTIVE_URL", base_url + "/failing")
+    monkeypatch.setattr(job_feeds, "MAX_RETRIES", 2)
+    now = time.time()
+    monkeypatch.setattr(feed_cache, "time", SimpleNamespace(time=lambda: now))
+    assert feed_cache.get_cached_jobs("developer", adzuna_pages=1) == []
+    assert calls["failing"] == 4
+    # Within the retry interval the failed feeds are not asked again
+    now += feed_cache.FAILED_RETRY_SECONDS - 1
+    assert feed_cache.get_cached_jobs("developer", adzuna_pages=1) == []
+    assert calls["failing"] == 4
+    now += 1
+    feed_cache.get_cached_jobs("developer", adzuna_pages=1)
+    assert calls["failing"] == 8
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
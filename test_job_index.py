@@ -0,0 +1,126 @@
+import os
+import random
+import sys
+
+import pytest
+
+import array_store
+import job_index
+import nlp_utils
+
+WORDS = [f"term{i}" for i in range(300)]
+
+
+def text(rng, length=30):
+    # Zipf-ish: low-numbered terms are common, the rest rare
+    return " ".join(WORDS[min(int(rng.paretovariate(0.8)) - 1, len(WORDS) - 1)] for _ in range(length))
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    rng = random.Random(0)
+    path = str(tmp_path / "index")
+    job_index.build_index([(job_id, text(rng)) for job_id in range(1, 401)], path)
+    # Stays in the unposted tail (below TAIL_COMPACT_RATIO)
+    job_index.add_to_index([(job_id, text(rng)) for job_id in range(401, 421)], path)
+    job_index.delete_from_index(range(1, 401, 7), path)
+    return path
+
+
+def assert_same_ranking(pruned, exhaustive):
+    assert [round(score, 5) for _, score in pruned] == [round(score, 5) for _, score in exhaustive]
+    # Ties at the cut may be broken either way
+    if pruned:
+        cut = pruned[-1][1]
+        assert {i for i, s in pruned if s > cut + 1e-6} == {i for i, s in exhaustive if s > cut + 1e-6}
+
+
+@pytest.mark.parametrize("prune_max_ratio", [job_index.PRUNE_MAX_RATIO, 1.0])
+@pytest.mark.parametrize("query", ["term0 term1 term2", "term3 term150", "term299", "term250 term251 unknownword"])
+@pytest.mark.parametrize("top_n", [1, 5, 50, None])
+def test_pruned_search_matches_exhaustive(index_dir, monkeypatch, prune_max_ratio, query, top_n):
+    monkeypatch.setattr(job_index, "PRUNE_MAX_RATIO", prune_max_ratio)
+    pruned = job_index.search_index(query, top_n, index_dir)
+    exhaustive = job_index.search_index(query, top_n, index_dir, exhaustive=True)
+    assert_same_ranking(pruned, exhaustive)
+    assert all(score > 0 for _, score in pruned)
+    assert not {job_id for job_id, _ in pruned} & set(range(1, 401, 7))
+
+
+def test_tail_rows_are_found(index_dir):
+    index = job_index.load_index(index_dir)
+    assert index["posted_docs"] < index["n_docs"]
+    tail_ids = {int(job_id) for job_id in index["ids"][index["posted_docs"]:]}
+    found = {job_id for job_id, _ in job_index.search_index("term0", None, index_dir)}
+    assert tail_ids & found
+
+
+def test_allowed_ids(index_dir):
+    allowed = set(range(1, 421, 3))
+    pruned = job_index.search_index("term0 term5 term9", 10, index_dir, allowed_ids=allowed)
+    exhaustive = job_index.search_index("term0 term5 term9", 10, index_dir, allowed_ids=allowed, exhaustive=True)
+    assert_same_ranking(pruned, exhaustive)
+    assert {job_id for job_id, _ in pruned} <= allowed - set(range(1, 401, 7))
+
+
+def test_deleted_top_hits_are_skipped(index_dir):
+    before = job_index.search_index("term0 term1", 10, index_dir)
+    deleted = {job_id for job_id, _ in before[:5]}
+    job_index.delete_from_index(deleted, index_dir)
+    after = job_index.search_index("term0 term1", 10, index_dir)
+    assert len(after) == 10 and not deleted & {job_id for job_id, _ in after}
+    assert_same_ranking(after, job_index.search_index("term0 term1", 10, index_dir, exhaustive=True))
+
+
+def test_recovery_after_truncated_append(index_dir):
+    # An append that died before meta.json was written: bytes past the
+    # committed arrays and a vocabulary line for a term no row uses
+    for name in ("ids", "indptr", "indices", "data"):
+        with open(array_store.array_path(index_dir, name), "ab") as f:
+            f.write(b"\x07" * 12)
+    with open(array_store.path(index_dir, job_index.VOCAB_FILE), "a", encoding="utf-8") as f:
+        f.write("lostterm\n")
+    job_index.add_to_index([(500, "term299 newterm"), (501, "term298 newterm")], index_dir)
+    index = job_index.load_index(index_dir)
+    assert index["n_docs"] == 422 and "lostterm" not in index["vocab"]
+    assert array_store.array_length(index_dir, "ids", job_index.ARRAYS["ids"]) == 422
+    assert array_store.array_length(index_dir, "indptr", job_index.ARRAYS["indptr"]) == 423
+    assert {job_id for job_id, _ in job_index.search_index("newterm", None, index_dir)} == {500, 501}
+    assert 500 in {job_id for job_id, _ in job_index.search_index("term299", None, index_dir)}
+
+
+def test_lemmas_are_updated_outside_appends(tmp_path, monkeypatch):
+    calls = []
+
+    def lemmatize_terms(terms):
+        calls.append(list(terms))
+        return [term.rstrip("s") for term in terms]
+
+    monkeypatch.setattr(nlp_utils, "model_installed", lambda name: True)
+    monkeypatch.setattr(nlp_utils, "lemmatize_terms", lemmatize_terms)
+    path = str(tmp_path / "index")
+    job_index.build_index([(1, "python skills"), (2, "python skill"), (3, "java")], path)
+    assert calls == [["java", "python", "skill", "skills"]]
+    idf = job_index.term_idf(["skill", "python"], path)
+    assert idf["skill"] == idf["python"]
+
+    job_index.add_to_index([(4, "rust"), (5, "rusts")], path)
+    assert len(calls) == 1
+    # Not lemmatized yet: looked up as words, df 1
+    before = job_index.term_idf(["rust"], path)["rust"]
+    assert job_index.update_lemmas(path) == 2 and calls[-1] == ["rust", "rusts"]
+    assert job_index.term_idf(["rust"], path)["rust"] < before
+    assert job_index.update_lemmas(path) == 0
+
+    # Lines an interrupted update left past the committed ones are cut
+    meta = array_store.read_meta(path)
+    assert meta["n_lemmas"] == 6
+    lemmas_path = array_store.path(path, job_index.LEMMAS_FILE)
+    with open(lemmas_path, "a", encoding="utf-8") as f:
+        f.write("lost\n")
+    job_index.add_to_index([(6, "go")], path)
+    assert os.path.getsize(lemmas_path) == meta["lemmas_size"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
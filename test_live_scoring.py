@@ -0,0 +1,67 @@
+import random
+import sys
+
+import pytest
+
+from live_scoring import LiveScorer
+from matching import score_resume
+from resume_sections import SECTION_WEIGHTS, split_resume_sections
+
+JOB_DESC = ("Senior Python developer with SQL, Docker and AWS experience. Machine learning projects are a plus; "
+            "a degree in computer science is preferred.")
+HEADERS = ["Skills", "Experience:", "Relevant Experience", "Education", "Projects -", "Summary",
+           "Skills: Python, SQL", "Certifications: AWS", "  • Technical Skills -"]
+WORDS = ["python", "sql", "docker", "aws", "developer", "machine", "learning", "projects", "degree", "computer",
+         "science", "java", "excel", "team", "led", "built", "experience", "skills", "education", "a", "I", "C++"]
+
+
+def random_line(rng):
+    if rng.random() < 0.2:
+        return rng.choice(HEADERS)
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 8)))
+
+
+def random_text(rng):
+    return "\n".join(random_line(rng) for _ in range(rng.randint(0, 25)))
+
+
+def random_edit(rng, text):
+    # Typing, deleting a selection, rewriting a line, or pasting a new resume
+    kind = rng.random()
+    if kind < 0.4:
+        position = rng.randint(0, len(text))
+        snippet = rng.choice([rng.choice(WORDS), " ", "\n", "\n" + random_line(rng), random_line(rng) + "\n"])
+        return text[:position] + snippet + text[position:]
+    if kind < 0.7:
+        start = rng.randint(0, len(text))
+        return text[:start] + text[start + rng.randint(1, 30):]
+    if kind < 0.95:
+        lines = text.split("\n")
+        lines[rng.randrange(len(lines))] = random_line(rng)
+        return "\n".join(lines)
+    return random_text(rng) if rng.random() < 0.8 else ""
+
+
+def assert_same_scores(live, full):
+    # Both round to two decimals; a score on a rounding boundary may differ by one step
+    (live_sections, live_overall, live_weighted), (sections, overall, weighted) = live, full
+    assert live_sections.keys() == sections.keys()
+    for name, score in sections.items():
+        assert live_sections[name] == pytest.approx(score, abs=0.011), name
+    assert live_overall == pytest.approx(overall, abs=0.011)
+    assert live_weighted == pytest.approx(weighted, abs=0.011) if weighted is not None else live_weighted is None
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_live_scores_match_full_scoring(seed):
+    rng = random.Random(seed)
+    scorer = LiveScorer(JOB_DESC, SECTION_WEIGHTS)
+    text = random_text(rng)
+    for _ in range(300):
+        text = random_edit(rng, text)
+        full = score_resume(split_resume_sections(text), JOB_DESC, text, SECTION_WEIGHTS)
+        assert_same_scores(scorer.update(text), full)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
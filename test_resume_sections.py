@@ -0,0 +1,29 @@
+from resume_sections import match_header, split_resume_sections
+
+
+def test_header_lines():
+    assert match_header("Skills") == ("Skills", None)
+    assert match_header("Relevant Experience:") == ("Experience", None)
+    assert match_header("  • Technical Skills -") == ("Skills", None)
+    assert match_header("Work History") == ("Work History", None)
+    assert match_header("Skills: Python, SQL") == ("Skills", len("Skills: "))
+
+
+def test_sentences_mentioning_a_section_are_not_headers():
+    assert match_header("Excellent communication skills") is None
+    assert match_header("Years of experience") is None
+    assert match_header("Academic Projects") is None
+
+
+def test_split_keeps_sentences_in_their_section():
+    sections = split_resume_sections("Summary\nExcellent communication skills\nYears of experience\nSkills: Python")
+    assert sections["Summary"] == "Excellent communication skills Years of experience"
+    assert sections["Skills"] == "Python"
+    assert "Experience" not in sections
+
+
+if __name__ == "__main__":
+    test_header_lines()
+    test_sentences_mentioning_a_section_are_not_headers()
+    test_split_keeps_sentences_in_their_section()
+    print("✅ Resume section tests passed!")
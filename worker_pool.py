@@ -0,0 +1,29 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Process pools shared by PDF extraction and batch screening. A pool is
+# created on first use and reused for the life of the process, so workers
+# (and the modules they import) start once rather than on every call. Spawned
+# workers do not inherit the server's threads and locks the way forked ones
+# would.
+MAX_DEFAULT_WORKERS = 4
+
+_pools = {}
+_lock = threading.Lock()
+
+
+def default_workers():
+    return min(os.cpu_count() or 1, MAX_DEFAULT_WORKERS)
+
+
+def get_pool(workers=None):
+    workers = workers or default_workers()
+    with _lock:
+        pool = _pools.get(workers)
+        # A pool whose worker died cannot take new tasks; start a fresh one
+        if pool is None or pool._broken:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pools[workers] = pool
+        return pool